@@ -0,0 +1,55 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from bus_data import BUS_DATA_FILE, load_bus_data
+from bus_stop_finder import assign_nearest_stops
+
+# Roster rows read per chunk when streaming a CSV
+CHUNK_ROWS = 10_000
+
+def assign_roster(roster, stops, lat_column='lat', lon_column='lon'):
+    """Return a copy of roster with each row's nearest stop, route and distance"""
+    positions, distances = assign_nearest_stops(roster[lat_column], roster[lon_column], stops)
+    found = positions >= 0
+    picked = np.where(found, positions, 0)
+
+    result = roster.copy()
+    result['Bus Stop'] = np.where(found, stops['Bus Stop'].to_numpy()[picked], None)
+    result['Bus Route'] = np.where(found, stops['Bus Route'].to_numpy()[picked], None)
+    result['Distance (km)'] = np.round(distances, 3)
+    return result
+
+def assign_csv(roster_path, output_path, stops_path=BUS_DATA_FILE,
+               lat_column='lat', lon_column='lon', chunk_rows=CHUNK_ROWS):
+    """Stream a roster CSV through the assignment and write the result CSV.
+
+    Only ``chunk_rows`` roster rows are held in memory at a time. Returns the
+    number of rows written.
+    """
+    stops = load_bus_data(stops_path)
+    written = 0
+    for chunk in pd.read_csv(roster_path, chunksize=chunk_rows, skipinitialspace=True):
+        chunk[lat_column] = pd.to_numeric(chunk[lat_column], errors='coerce')
+        chunk[lon_column] = pd.to_numeric(chunk[lon_column], errors='coerce')
+        assigned = assign_roster(chunk, stops, lat_column, lon_column)
+        assigned.to_csv(output_path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += len(assigned)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign every student in a roster to their nearest bus stop")
+    parser.add_argument("roster", help="CSV with one row per student")
+    parser.add_argument("output", help="CSV to write the assignments to")
+    parser.add_argument("--stops", default=BUS_DATA_FILE, help="bus route CSV")
+    parser.add_argument("--lat-column", default="lat")
+    parser.add_argument("--lon-column", default="lon")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    count = assign_csv(args.roster, args.output, args.stops, args.lat_column, args.lon_column, args.chunk_rows)
+    print(f"Assigned {count} students to bus stops -> {args.output}")
+
+if __name__ == "__main__":
+    main()
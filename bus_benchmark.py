@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+from bus_data import format_departure, read_bus_data
+from bus_snapshot import load_snapshot
+from bus_stop_finder import find_nearest_stop, stop_coordinates
+from bus_timetable import TimetableIndex
+from geo_index import GeoIndex
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+# The iterrows + geodesic baseline takes seconds per query past this size
+LEGACY_MAX_STOPS = 10_000
+
+# Bounding box of the synthetic city, roughly greater Chennai
+CITY_BOUNDS = (12.85, 13.25, 79.95, 80.32)
+
+STOPS_PER_ROUTE = 20
+
+def synthetic_stops(n, seed=0):
+    """Generate a bus table of n stops shaped like bus_routes_with_coordinates.csv"""
+    rng = np.random.default_rng(seed)
+    lat_min, lat_max, lon_min, lon_max = CITY_BOUNDS
+    route = np.arange(n) // STOPS_PER_ROUTE
+    first = rng.integers(5 * 60, 9 * 60, size=route.max() + 1 if n else 0)
+    departure = first[route] + (np.arange(n) % STOPS_PER_ROUTE) * 3
+
+    return pd.DataFrame({
+        'Bus Route': [f"{r}. Route {r}" for r in route],
+        'Bus Stop': [f"Stop {i}" for i in range(n)],
+        'Time': [format_departure(m).lower().replace(':', '.') for m in departure],
+        'Latitude': np.round(rng.uniform(lat_min, lat_max, n), 6),
+        'Longitude': np.round(rng.uniform(lon_min, lon_max, n), 6),
+    })
+
+def legacy_find_nearest_stop(user_lat, user_lon, df):
+    """The original row-by-row implementation, kept as the baseline"""
+    min_distance = float('inf')
+    nearest_stop = None
+    for _, row in df.iterrows():
+        distance = geodesic((user_lat, user_lon), (row['Latitude'], row['Longitude'])).kilometers
+        if distance < min_distance:
+            min_distance = distance
+            nearest_stop = row
+    return nearest_stop, min_distance
+
+def measure(operation, queries):
+    """Run operation once per query and summarise the latencies"""
+    latencies = []
+    start = time.perf_counter()
+    for query in queries:
+        t0 = time.perf_counter()
+        operation(*query)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'queries': len(latencies),
+        'throughput_per_s': len(latencies) / total if total else None,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+    }
+
+def measure_once(operation):
+    t0 = time.perf_counter()
+    result = operation()
+    return result, {'seconds': time.perf_counter() - t0}
+
+def run_size(n, n_queries, workdir, seed=0):
+    """Benchmark every bus finder operation on a synthetic table of n stops"""
+    csv_path = os.path.join(workdir, f"stops_{n}.csv")
+    synthetic_stops(n, seed).to_csv(csv_path, index=False)
+
+    results = {'stops': n}
+    _, results['csv_load_pandas'] = measure_once(lambda: pd.read_csv(csv_path))
+    df, results['csv_load_typed'] = measure_once(lambda: read_bus_data(csv_path))
+    _, results['snapshot_build'] = measure_once(lambda: load_snapshot(csv_path, workdir))
+    _, results['snapshot_load'] = measure_once(lambda: load_snapshot(csv_path, workdir))
+
+    lats, lons = stop_coordinates(df)
+    index, results['index_build'] = measure_once(lambda: GeoIndex(lats, lons))
+    timetable, results['timetable_build'] = measure_once(lambda: TimetableIndex.from_dataframe(df))
+
+    rng = np.random.default_rng(seed + 1)
+    lat_min, lat_max, lon_min, lon_max = CITY_BOUNDS
+    points = list(zip(rng.uniform(lat_min, lat_max, n_queries), rng.uniform(lon_min, lon_max, n_queries)))
+    stop_names = df['Bus Stop'].to_numpy()
+
+    if n <= LEGACY_MAX_STOPS:
+        legacy_df = pd.read_csv(csv_path)
+        legacy_queries = points[:max(1, n_queries // 10)]
+        results['nearest_legacy'] = measure(lambda lat, lon: legacy_find_nearest_stop(lat, lon, legacy_df), legacy_queries)
+    else:
+        results['nearest_legacy'] = {'skipped': f"more than {LEGACY_MAX_STOPS} stops"}
+
+    results['nearest_vectorized'] = measure(lambda lat, lon: find_nearest_stop(lat, lon, df), points)
+    results['nearest_index'] = measure(lambda lat, lon: index.nearest(lat, lon, 1), points)
+    results['knn_5'] = measure(lambda lat, lon: index.nearest(lat, lon, 5), points)
+    results['radius_1km'] = measure(lambda lat, lon: index.within(lat, lon, 1.0), points)
+
+    def next_departures(lat, lon):
+        nearest, _ = index.nearest(lat, lon, 1)
+        return timetable.next_departures(stop_names[nearest[0]], 7 * 60, 5)
+
+    results['next_departures'] = measure(next_departures, points)
+
+    legacy = results['nearest_legacy'].get('mean_ms')
+    if legacy:
+        results['speedup_vs_legacy'] = {
+            name: legacy / results[name]['mean_ms']
+            for name in ('nearest_vectorized', 'nearest_index')
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bus stop finder on synthetic city-scale data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="stop counts to test")
+    parser.add_argument("--queries", type=int, default=1000, help="queries per operation")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report = {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'queries': args.queries,
+            'results': [run_size(n, args.queries, workdir) for n in args.sizes],
+        }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+BUS_DATA_FILE = 'bus_routes_with_coordinates.csv'
+
+# File extensions treated as SQLite transit stores instead of CSV
+TRANSIT_STORE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+# Departure value used when the Time column can't be parsed
+NO_DEPARTURE = -1
+
+_TIME_PATTERN = re.compile(r"^\s*(\d{1,2})(?:[.:](\d{2}))?\s*([ap]\.?m\.?)?\s*$", re.IGNORECASE)
+
+def parse_departure(text):
+    """Convert a time such as "5.45 am" or "17:45" to minutes since midnight"""
+    match = _TIME_PATTERN.match(str(text))
+    if not match:
+        return NO_DEPARTURE
+
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            return NO_DEPARTURE
+        hours %= 12
+        if meridiem[0].lower() == 'p':
+            hours += 12
+
+    if hours > 23 or minutes > 59:
+        return NO_DEPARTURE
+    return hours * 60 + minutes
+
+def format_departure(minutes):
+    """Convert minutes since midnight back to a "5:45 AM" style label.
+
+    GTFS times run past midnight for late trips ("25:00:00" is 1 AM the next
+    day); those are labelled with the days they run over, "1:00 AM (+1)".
+    """
+    if minutes < 0:
+        return "--"
+    days, minutes = divmod(int(minutes), 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    label = f"{(hours - 1) % 12 + 1}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+    return f"{label} (+{days})" if days else label
+
+def is_transit_store(path):
+    """Whether path points at a SQLite store built by ``bus_gtfs_store``"""
+    return str(path).lower().endswith(TRANSIT_STORE_SUFFIXES)
+
+def read_bus_data(path=BUS_DATA_FILE):
+    """Parse the bus route CSV into a compact, typed DataFrame.
+
+    Routes, stops and raw times become categoricals, coordinates float32 and
+    the Time column is additionally parsed into a ``Departure`` column of
+    int16 minutes since midnight. A SQLite transit store is read into the
+    same shape.
+    """
+    if is_transit_store(path):
+        # Imported here because the store module itself builds on this one
+        from bus_gtfs_store import read_stop_table
+        return read_stop_table(path)
+
+    df = pd.read_csv(
+        path,
+        skipinitialspace=True,
+        dtype={
+            'Bus Route': 'category',
+            'Bus Stop': 'category',
+            'Time': 'category',
+            'Latitude': np.float32,
+            'Longitude': np.float32,
+        }
+    )
+
+    # Parse each distinct time once; the trailing entry catches missing values (code -1)
+    minutes = [parse_departure(t) for t in df['Time'].cat.categories] + [NO_DEPARTURE]
+    df['Departure'] = np.array(minutes, dtype=np.int16)[df['Time'].cat.codes.to_numpy()]
+    return df
+
+# Keep a memory-mapped snapshot of each CSV and its indexes for fast cold starts
+USE_SNAPSHOTS = os.environ.get('BUS_SNAPSHOTS', '1') != '0'
+
+_lock = threading.RLock()
+_datasets = {}
+_building = {}
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _read(path):
+    if USE_SNAPSHOTS and not is_transit_store(path):
+        # Imported here because the snapshot module itself builds on this one
+        from bus_snapshot import load_snapshot
+        try:
+            snapshot = load_snapshot(path)
+            return snapshot.data, {'geo_index': snapshot.index, 'timetable': snapshot.timetable}
+        except OSError:
+            # e.g. a read-only cache directory; fall back to parsing the CSV
+            pass
+    return read_bus_data(path), {}
+
+def _entry(path):
+    key = os.path.abspath(path)
+    if key in _building:
+        # Builders that load other derived structures see the same version
+        return _building[key]
+
+    stamp = _file_stamp(path)
+    entry = _datasets.get(key)
+    if entry is None or entry['stamp'] != stamp:
+        data, derived = _read(path)
+        entry = {'stamp': stamp, 'data': data, 'derived': derived}
+        _datasets[key] = entry
+    return entry
+
+def load_bus_data(path=BUS_DATA_FILE):
+    """Return the typed bus table, shared by every session in the process.
+
+    The file is parsed once and only re-read when its modification time or
+    size changes. The returned DataFrame is shared, so callers must not
+    modify it in place.
+    """
+    with _lock:
+        return _entry(path)['data']
+
+def load_derived(name, builder, path=BUS_DATA_FILE):
+    """Return ``builder(data)`` computed once per version of the bus table.
+
+    Use this for indexes and other structures derived from the table; they
+    are rebuilt automatically when the CSV changes. Structures stored in the
+    snapshot ("geo_index" and "timetable") are returned without building.
+    """
+    with _lock:
+        entry = _entry(path)
+        if name not in entry['derived']:
+            key = os.path.abspath(path)
+            # Builders may load other derived structures; only the outermost
+            # call clears the entry they share
+            outer = _building.get(key)
+            _building[key] = entry
+            try:
+                entry['derived'][name] = builder(entry['data'])
+            finally:
+                if outer is None:
+                    del _building[key]
+                else:
+                    _building[key] = outer
+        return entry['derived'][name]
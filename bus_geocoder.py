@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from geopy.extra.rate_limiter import RateLimiter
+from geopy.geocoders import Nominatim
+
+from caching import shared_instance, write_json_atomic
+
+CACHE_DIR = "cache"
+GAZETTEER_FILE = "gazetteer.json"
+USER_AGENT = "bus_stop_locator"
+
+# Number of resolved queries kept in memory
+LRU_SIZE = 1024
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_DELAY = 1.0
+
+def normalize_query(query):
+    """Normalize a place name so equivalent spellings share one cache entry"""
+    return re.sub(r"\s+", " ", str(query)).strip().casefold()
+
+def cache_path(query, cache_dir=CACHE_DIR):
+    """Path of the on-disk cache file for a normalized query"""
+    digest = hashlib.sha1(f"geocode:{query}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.json")
+
+def load_gazetteer(path=GAZETTEER_FILE):
+    """Load the offline table of local place names"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        places = json.load(f)
+    return {normalize_query(name): (float(lat), float(lon)) for name, (lat, lon) in places.items()}
+
+class Geocoder:
+    """Resolve place names to coordinates through several tiers.
+
+    Lookups go through an in-process LRU, the offline gazetteer, JSON files
+    in the cache directory and finally Nominatim. Concurrent requests for the
+    same place share a single resolution.
+    """
+
+    def __init__(self, gazetteer=None, cache_dir=CACHE_DIR, lru_size=LRU_SIZE, online=True):
+        self.gazetteer = dict(gazetteer or {})
+        self.cache_dir = cache_dir
+        self.lru_size = lru_size
+        self.online = online
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._geocode = None
+
+    def add_places(self, places):
+        """Add name -> (lat, lon) entries to the offline gazetteer"""
+        entries = {normalize_query(name): (float(lat), float(lon)) for name, (lat, lon) in places.items()}
+        with self._lock:
+            for key, coords in entries.items():
+                self.gazetteer.setdefault(key, coords)
+
+    def geocode(self, query):
+        """Return (latitude, longitude) for a place name, or None if unknown"""
+        key = normalize_query(query)
+        if not key:
+            return None
+
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                waiter = self._inflight[key] = {"event": threading.Event()}
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            waiter["event"].wait()
+            if "error" in waiter:
+                raise waiter["error"]
+            return waiter["result"]
+
+        try:
+            result = self._resolve(key)
+            waiter["result"] = result
+            with self._lock:
+                self._remember(key, result)
+            return result
+        except Exception as e:
+            waiter["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            waiter["event"].set()
+
+    def _remember(self, key, result):
+        self._lru[key] = result
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _resolve(self, key):
+        if key in self.gazetteer:
+            return self.gazetteer[key]
+
+        cached = self._read_disk(key)
+        if cached is not None:
+            return cached
+
+        if not self.online:
+            return None
+
+        location_info = self._nominatim()(key)
+        if not location_info:
+            return None
+
+        result = (location_info.latitude, location_info.longitude)
+        self._write_disk(key, result)
+        return result
+
+    def _nominatim(self):
+        # One client per process; the rate limiter serialises requests for us
+        with self._lock:
+            if self._geocode is None:
+                geolocator = Nominatim(user_agent=USER_AGENT)
+                self._geocode = RateLimiter(
+                    geolocator.geocode,
+                    min_delay_seconds=NOMINATIM_MIN_DELAY,
+                    swallow_exceptions=False
+                )
+            return self._geocode
+
+    def _read_disk(self, key):
+        path = cache_path(key, self.cache_dir)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return (data["latitude"], data["longitude"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key, result):
+        write_json_atomic(cache_path(key, self.cache_dir), {"query": key, "latitude": result[0], "longitude": result[1]})
+
+@shared_instance
+def get_geocoder():
+    """Return the geocoder shared by every session in this process"""
+    return Geocoder(gazetteer=load_gazetteer())
+
+def geocode(query):
+    """Resolve a place name with the shared geocoder"""
+    return get_geocoder().geocode(query)
@@ -0,0 +1,419 @@
+import argparse
+import csv
+import io
+import logging
+import math
+import os
+import sqlite3
+import threading
+import zipfile
+from contextlib import contextmanager
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from bus_data import NO_DEPARTURE, format_departure, read_bus_data
+from bus_journey_planner import Pattern, TransitNetwork
+from geo_index import EARTH_RADIUS_KM, haversine_km
+
+# Rows written per INSERT batch during an import
+BATCH_SIZE = 5000
+
+# First search radius used by nearest_stops; it doubles until enough stops are found
+SEARCH_RADIUS_KM = 0.5
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stops (
+    stop_pk INTEGER PRIMARY KEY,
+    stop_id TEXT NOT NULL UNIQUE,
+    stop_name TEXT NOT NULL,
+    stop_lat REAL NOT NULL,
+    stop_lon REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stops_name ON stops (stop_name);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS stops_rtree USING rtree (
+    stop_pk, min_lat, max_lat, min_lon, max_lon
+);
+
+CREATE TABLE IF NOT EXISTS routes (
+    route_pk INTEGER PRIMARY KEY,
+    route_id TEXT NOT NULL UNIQUE,
+    route_name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS trips (
+    trip_pk INTEGER PRIMARY KEY,
+    trip_id TEXT NOT NULL UNIQUE,
+    route_pk INTEGER NOT NULL REFERENCES routes (route_pk),
+    service_id TEXT
+);
+CREATE INDEX IF NOT EXISTS trips_route ON trips (route_pk);
+
+CREATE TABLE IF NOT EXISTS stop_times (
+    trip_pk INTEGER NOT NULL REFERENCES trips (trip_pk),
+    stop_sequence INTEGER NOT NULL,
+    stop_pk INTEGER NOT NULL REFERENCES stops (stop_pk),
+    arrival INTEGER NOT NULL,
+    departure INTEGER NOT NULL,
+    PRIMARY KEY (trip_pk, stop_sequence)
+) WITHOUT ROWID;
+"""
+
+# Created after the bulk load of stop_times, which is much faster than
+# maintaining the index row by row
+STOP_TIMES_INDEX = "CREATE INDEX IF NOT EXISTS stop_times_departure ON stop_times (stop_pk, departure)"
+
+def parse_gtfs_time(text):
+    """Convert a GTFS "HH:MM:SS" time (hours may exceed 23) to minutes since midnight"""
+    try:
+        hours, minutes, *_ = str(text).strip().split(":")
+        return int(hours) * 60 + int(minutes)
+    except ValueError:
+        return NO_DEPARTURE
+
+def connect(db_path):
+    """Open a transit store and make sure its schema exists"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+@contextmanager
+def _open_feed_file(feed, name):
+    # A feed is either a directory of .txt files or a GTFS zip archive
+    if os.path.isdir(feed):
+        with open(os.path.join(feed, name), "r", encoding="utf-8-sig", newline="") as f:
+            yield f
+        return
+    with zipfile.ZipFile(feed) as archive, archive.open(name) as member:
+        yield io.TextIOWrapper(member, encoding="utf-8-sig", newline="")
+
+def _batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def _load(conn, name, sql, rows):
+    """Insert rows in batches and return how many were inserted.
+
+    Rows that reference an unknown trip, stop or route select nothing and
+    are skipped; their number is logged.
+    """
+    inserted = read = 0
+    for batch in _batches(rows):
+        with conn:
+            inserted += conn.executemany(sql, batch).rowcount
+        read += len(batch)
+    if read > inserted:
+        logger.warning("Skipped %d of %d %s rows that reference unknown ids", read - inserted, read, name)
+    return inserted
+
+def _clear(conn):
+    with conn:
+        conn.execute("DROP INDEX IF EXISTS stop_times_departure")
+        for table in ("stop_times", "trips", "routes", "stops_rtree", "stops"):
+            conn.execute(f"DELETE FROM {table}")
+
+def _finish(conn):
+    with conn:
+        conn.execute("""
+            INSERT INTO stops_rtree (stop_pk, min_lat, max_lat, min_lon, max_lon)
+            SELECT stop_pk, stop_lat, stop_lat, stop_lon, stop_lon FROM stops
+        """)
+        conn.execute(STOP_TIMES_INDEX)
+    conn.execute("ANALYZE")
+
+def import_feed(feed, db_path):
+    """Stream a GTFS feed (directory or zip) into a SQLite transit store.
+
+    Existing data in the store is replaced. Files are read row by row and
+    written in batches of BATCH_SIZE, so memory use does not grow with the
+    size of the feed. Returns the number of rows imported per file.
+    """
+    conn = connect(db_path)
+    try:
+        _clear(conn)
+        counts = {}
+
+        with _open_feed_file(feed, "stops.txt") as f:
+            counts["stops"] = _load(conn, "stops", """
+                INSERT INTO stops (stop_id, stop_name, stop_lat, stop_lon) VALUES (?, ?, ?, ?)
+            """, (
+                (row["stop_id"], row.get("stop_name", row["stop_id"]).strip(),
+                 float(row["stop_lat"]), float(row["stop_lon"]))
+                for row in csv.DictReader(f)
+                if row.get("stop_lat") and row.get("stop_lon")
+            ))
+
+        with _open_feed_file(feed, "routes.txt") as f:
+            counts["routes"] = _load(conn, "routes", """
+                INSERT INTO routes (route_id, route_name) VALUES (?, ?)
+            """, (
+                (row["route_id"],
+                 row.get("route_short_name") or row.get("route_long_name") or row["route_id"])
+                for row in csv.DictReader(f)
+            ))
+
+        with _open_feed_file(feed, "trips.txt") as f:
+            counts["trips"] = _load(conn, "trips", """
+                INSERT INTO trips (trip_id, route_pk, service_id)
+                SELECT ?, route_pk, ? FROM routes WHERE route_id = ?
+            """, (
+                (row["trip_id"], row.get("service_id"), row["route_id"])
+                for row in csv.DictReader(f)
+            ))
+
+        with _open_feed_file(feed, "stop_times.txt") as f:
+            counts["stop_times"] = _load(conn, "stop_times", """
+                INSERT INTO stop_times (trip_pk, stop_sequence, stop_pk, arrival, departure)
+                SELECT trips.trip_pk, ?, stops.stop_pk, ?, ?
+                FROM trips, stops WHERE trips.trip_id = ? AND stops.stop_id = ?
+            """, _stop_time_rows(csv.DictReader(f)))
+
+        _finish(conn)
+        return counts
+    finally:
+        conn.close()
+
+def _stop_time_rows(reader):
+    for row in reader:
+        departure = parse_gtfs_time(row.get("departure_time") or row.get("arrival_time"))
+        arrival = parse_gtfs_time(row.get("arrival_time") or row.get("departure_time"))
+        if departure == NO_DEPARTURE:
+            continue
+        yield (int(row["stop_sequence"]), arrival, departure, row["trip_id"], row["stop_id"])
+
+def import_bus_csv(csv_path, db_path):
+    """Convert the flat bus route CSV into a transit store, one trip per route"""
+    df = read_bus_data(csv_path)
+    df = df[df['Departure'] != NO_DEPARTURE]
+    conn = connect(db_path)
+    try:
+        _clear(conn)
+        stops = df.drop_duplicates('Bus Stop')
+        routes = list(dict.fromkeys(df['Bus Route'].astype(str)))
+        _load(conn, "stops", "INSERT INTO stops (stop_id, stop_name, stop_lat, stop_lon) VALUES (?, ?, ?, ?)", (
+            (str(name).strip(), str(name).strip(), float(lat), float(lon))
+            for name, lat, lon in zip(stops['Bus Stop'], stops['Latitude'], stops['Longitude'])
+        ))
+        _load(conn, "routes", "INSERT INTO routes (route_id, route_name) VALUES (?, ?)", ((r, r) for r in routes))
+        _load(conn, "trips", "INSERT INTO trips (trip_id, route_pk) SELECT ?, route_pk FROM routes WHERE route_id = ?",
+              ((r, r) for r in routes))
+
+        sequence = df.groupby('Bus Route', observed=True).cumcount()
+        _load(conn, "stop_times", """
+            INSERT INTO stop_times (trip_pk, stop_sequence, stop_pk, arrival, departure)
+            SELECT trips.trip_pk, ?, stops.stop_pk, ?, ?
+            FROM trips, stops WHERE trips.trip_id = ? AND stops.stop_id = ?
+        """, (
+            (int(seq), int(dep), int(dep), str(route), str(stop).strip())
+            for seq, dep, route, stop in zip(sequence, df['Departure'], df['Bus Route'], df['Bus Stop'])
+        ))
+        _finish(conn)
+    finally:
+        conn.close()
+
+def read_stop_table(db_path):
+    """Read the store as a bus table shaped like ``bus_data.read_bus_data``.
+
+    There is one row per (route, stop) pair, timed by the route's earliest
+    departure from that stop; individual trips stay in the store.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        df = pd.read_sql_query("""
+            SELECT routes.route_name AS "Bus Route", stops.stop_name AS "Bus Stop",
+                   MIN(stop_times.departure) AS "Departure",
+                   stops.stop_lat AS "Latitude", stops.stop_lon AS "Longitude"
+            FROM stop_times
+            JOIN trips ON trips.trip_pk = stop_times.trip_pk
+            JOIN routes ON routes.route_pk = trips.route_pk
+            JOIN stops ON stops.stop_pk = stop_times.stop_pk
+            GROUP BY routes.route_pk, stops.stop_pk
+            ORDER BY routes.route_pk, MIN(stop_times.stop_sequence)
+        """, conn)
+    finally:
+        conn.close()
+
+    df['Time'] = [format_departure(m) for m in df['Departure']]
+    return df.astype({
+        'Bus Route': 'category',
+        'Bus Stop': 'category',
+        'Time': 'category',
+        'Latitude': np.float32,
+        'Longitude': np.float32,
+        'Departure': np.int16,
+    })[['Bus Route', 'Bus Stop', 'Time', 'Latitude', 'Longitude', 'Departure']]
+
+def _stops_in_box(conn, lat, lon, radius_km):
+    # (distance_km, stop_name) for every stop in the R*Tree box around a circle
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    rows = conn.execute("""
+        SELECT stops.stop_name, stops.stop_lat, stops.stop_lon
+        FROM stops_rtree JOIN stops ON stops.stop_pk = stops_rtree.stop_pk
+        WHERE min_lat <= ? AND max_lat >= ? AND min_lon <= ? AND max_lon >= ?
+    """, (lat + dlat, lat - dlat, lon + dlon, lon - dlon)).fetchall()
+    return sorted(
+        (float(haversine_km(lat, lon, stop_lat, stop_lon)), name) for name, stop_lat, stop_lon in rows
+    )
+
+def nearest_stops(conn, lat, lon, k=3):
+    """Return up to k (stop_name, distance_km) pairs using the R*Tree index"""
+    radius = SEARCH_RADIUS_KM
+    total = conn.execute("SELECT COUNT(*) FROM stops_rtree").fetchone()[0]
+    while True:
+        found = _stops_in_box(conn, lat, lon, radius)
+        # Only stops inside the search circle are guaranteed to be the closest ones
+        inside = [distance for distance, _ in found if distance <= radius]
+        if len(inside) >= k or len(found) >= total:
+            return [(name, distance) for distance, name in found][:k]
+        radius *= 2
+
+def stops_within(conn, lat, lon, radius_km):
+    """Return all (stop_name, distance_km) pairs within radius_km, nearest first, using the R*Tree index"""
+    return [(name, distance) for distance, name in _stops_in_box(conn, lat, lon, radius_km) if distance <= radius_km]
+
+class StoreStopIndex:
+    """Nearest-stop queries over a store's stop table, answered by its R*Tree.
+
+    Has the same ``nearest``/``within`` interface as ``geo_index.GeoIndex``;
+    indices are row positions in the table ``read_stop_table`` returns. The
+    R*Tree finds the closest stops, which are then expanded to their
+    (route, stop) rows, so no in-memory tree is built over the table.
+    """
+
+    def __init__(self, db_path, df):
+        self.db_path = db_path
+        self._lats = df['Latitude'].to_numpy(dtype=float)
+        self._lons = df['Longitude'].to_numpy(dtype=float)
+        self._rows = df.groupby('Bus Stop', observed=True).indices
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lats)
+
+    def _rank(self, lat, lon, names):
+        # Rows of the named stops, nearest first
+        rows = [self._rows[name] for name in names if name in self._rows]
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        rows = np.unique(np.concatenate(rows))
+        distances = haversine_km(lat, lon, self._lats[rows], self._lons[rows])
+        order = np.argsort(distances, kind="stable")
+        return rows[order], distances[order]
+
+    def nearest(self, lat, lon, k=1):
+        """Return (indices, distances_km) of the k rows closest to lat/lon"""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        # Every stop has at least one row, so the k nearest rows belong to the k nearest stops
+        with self._lock:
+            stops = nearest_stops(self._conn, lat, lon, k)
+        indices, distances = self._rank(lat, lon, [name for name, _ in stops])
+        return indices[:k], distances[:k]
+
+    def within(self, lat, lon, radius_km):
+        """Return (indices, distances_km) of all rows within radius_km, nearest first"""
+        with self._lock:
+            stops = stops_within(self._conn, lat, lon, radius_km)
+        indices, distances = self._rank(lat, lon, [name for name, _ in stops])
+        keep = distances <= radius_km
+        return indices[keep], distances[keep]
+
+class StoreTimetable:
+    """Next-departure lookups answered by the store's (stop, departure) index.
+
+    Has the same ``next_departures`` interface as ``bus_timetable.TimetableIndex``
+    but covers every trip in the feed instead of one departure per route.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # One connection for the life of the index; sessions take turns on it
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def __contains__(self, stop):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM stops WHERE stop_name = ?", (stop,)).fetchone() is not None
+
+    def next_departures(self, stop, after, n=5):
+        """Return up to n (departure_minutes, route) pairs from stop at or after ``after``"""
+        with self._lock:
+            return self._conn.execute("""
+                SELECT stop_times.departure, routes.route_name
+                FROM stops
+                JOIN stop_times ON stop_times.stop_pk = stops.stop_pk
+                JOIN trips ON trips.trip_pk = stop_times.trip_pk
+                JOIN routes ON routes.route_pk = trips.route_pk
+                WHERE stops.stop_name = ? AND stop_times.departure >= ?
+                ORDER BY stop_times.departure
+                LIMIT ?
+            """, (stop, after, n)).fetchall()
+
+def build_network(db_path):
+    """Build a journey-planning network with every trip in the store"""
+    conn = sqlite3.connect(db_path)
+    try:
+        stops = conn.execute("SELECT stop_pk, stop_name, stop_lat, stop_lon FROM stops ORDER BY stop_pk").fetchall()
+
+        # Stops sharing a name are merged, as they are for the flat CSV
+        stop_ids, names, lats, lons = {}, {}, [], []
+        for stop_pk, name, lat, lon in stops:
+            if name not in names:
+                names[name] = len(names)
+                lats.append(lat)
+                lons.append(lon)
+            stop_ids[stop_pk] = names[name]
+
+        # Trips that share a route and stop sequence form one pattern
+        patterns = {}
+        trip_pk, route, sequence, times = None, None, [], []
+        rows = conn.execute("""
+            SELECT stop_times.trip_pk, routes.route_name, stop_times.stop_pk, stop_times.departure
+            FROM stop_times
+            JOIN trips ON trips.trip_pk = stop_times.trip_pk
+            JOIN routes ON routes.route_pk = trips.route_pk
+            ORDER BY stop_times.trip_pk, stop_times.stop_sequence
+        """)
+        for row in rows:
+            if row[0] != trip_pk:
+                if sequence:
+                    patterns.setdefault((route, tuple(sequence)), []).append(times)
+                trip_pk, route, sequence, times = row[0], row[1], [], []
+            sequence.append(stop_ids[row[2]])
+            times.append(row[3])
+        if sequence:
+            patterns.setdefault((route, tuple(sequence)), []).append(times)
+    finally:
+        conn.close()
+
+    return TransitNetwork(
+        list(names), lats, lons,
+        [Pattern(route, stops, trips) for (route, stops), trips in patterns.items()]
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Import bus data into a SQLite transit store")
+    parser.add_argument("source", help="GTFS directory or zip, or the flat bus route CSV")
+    parser.add_argument("database", help="SQLite file to write")
+    args = parser.parse_args()
+
+    if args.source.lower().endswith(".csv"):
+        import_bus_csv(args.source, args.database)
+        print(f"Imported {args.source} into {args.database}")
+    else:
+        counts = import_feed(args.source, args.database)
+        print(", ".join(f"{count} {name}" for name, count in counts.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import math
+from bisect import bisect_left
+
+import numpy as np
+
+from bus_data import NO_DEPARTURE
+from geo_index import WALKING_SPEED, GeoIndex
+
+# Longest walk, in km, offered as a transfer between two stops
+MAX_WALK_KM = 0.5
+
+# Number of buses a journey may use
+MAX_RIDES = 4
+
+def walking_minutes(distance_km):
+    """Whole minutes needed to walk distance_km"""
+    return math.ceil(distance_km * 1000 / WALKING_SPEED / 60)
+
+class Pattern:
+    """Trips of one route that visit the same sequence of stops.
+
+    ``times[i]`` lists the departure minutes of every trip at the i-th stop,
+    sorted so the earliest catchable trip can be found by bisection.
+    """
+
+    def __init__(self, route, stops, trips):
+        trips = sorted(trips, key=lambda trip: trip[0])
+        self.route = route
+        self.stops = list(stops)
+        self.trips = trips
+        self.times = [[trip[i] for trip in trips] for i in range(len(self.stops))]
+
+    def earliest_trip(self, position, after):
+        """Index of the first trip leaving stop ``position`` at or after ``after``"""
+        trip = bisect_left(self.times[position], after)
+        return trip if trip < len(self.trips) else None
+
+class TransitNetwork:
+    """Route patterns and walking transfers precomputed for journey planning"""
+
+    def __init__(self, stop_names, stop_lats, stop_lons, patterns, max_walk_km=MAX_WALK_KM):
+        self.stop_names = list(stop_names)
+        self.stop_ids = {name: i for i, name in enumerate(self.stop_names)}
+        self.patterns = patterns
+
+        # Patterns serving each stop, with the stop's position along the pattern
+        self.serving = [[] for _ in self.stop_names]
+        for pattern_id, pattern in enumerate(patterns):
+            for position, stop in enumerate(pattern.stops):
+                self.serving[stop].append((pattern_id, position))
+
+        # Walking transfers to every stop within max_walk_km
+        self.footpaths = [[] for _ in self.stop_names]
+        if self.stop_names:
+            index = GeoIndex(stop_lats, stop_lons)
+            for stop, (lat, lon) in enumerate(zip(stop_lats, stop_lons)):
+                neighbours, distances = index.within(lat, lon, max_walk_km)
+                self.footpaths[stop] = [
+                    (int(other), walking_minutes(distance))
+                    for other, distance in zip(neighbours, distances)
+                    if other != stop
+                ]
+
+    @classmethod
+    def from_dataframe(cls, df, max_walk_km=MAX_WALK_KM):
+        """Build the network from a table returned by ``bus_data.load_bus_data``.
+
+        Each route's rows, in file order, form one trip along its stops.
+        """
+        df = df[df['Departure'] != NO_DEPARTURE]
+        names = df['Bus Stop'].astype(str).str.strip().to_numpy()
+        lats = df['Latitude'].to_numpy(dtype=float)
+        lons = df['Longitude'].to_numpy(dtype=float)
+
+        stop_ids, stop_lats, stop_lons = {}, [], []
+        for name, lat, lon in zip(names, lats, lons):
+            if name not in stop_ids:
+                stop_ids[name] = len(stop_ids)
+                stop_lats.append(lat)
+                stop_lons.append(lon)
+
+        patterns = []
+        routes = df['Bus Route'].astype(str).to_numpy()
+        departures = df['Departure'].to_numpy()
+        for route in dict.fromkeys(routes):
+            rows = np.flatnonzero(routes == route)
+            stops = [stop_ids[names[row]] for row in rows]
+            patterns.append(Pattern(route, stops, [[int(departures[row]) for row in rows]]))
+
+        return cls(list(stop_ids), stop_lats, stop_lons, patterns, max_walk_km)
+
+    def plan(self, origin, destination, depart_after, max_rides=MAX_RIDES):
+        """Plan the earliest-arriving journey between two stop names.
+
+        Uses RAPTOR: round k finds the best arrival at every stop using at
+        most k buses, followed by one walking transfer. Returns a list of
+        legs, or None when the destination can't be reached. Each leg is a
+        dict with mode ("bus" or "walk"), from, to, depart and arrive in
+        minutes since midnight, plus route for bus legs.
+        """
+        source = self.stop_ids.get(origin)
+        target = self.stop_ids.get(destination)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return []
+
+        n = len(self.stop_names)
+        best = [math.inf] * n
+        labels = [[math.inf] * n]
+        parents = [[None] * n]
+
+        labels[0][source] = best[source] = depart_after
+        marked = {source}
+        for other, minutes in self.footpaths[source]:
+            labels[0][other] = best[other] = depart_after + minutes
+            parents[0][other] = ('walk', source, minutes)
+            marked.add(other)
+
+        for k in range(1, max_rides + 1):
+            previous = labels[k - 1]
+            current = list(previous)
+            parent = [None] * n
+            labels.append(current)
+            parents.append(parent)
+
+            # Each pattern is scanned once, from its first marked stop
+            queue = {}
+            for stop in marked:
+                for pattern_id, position in self.serving[stop]:
+                    if position < queue.get(pattern_id, math.inf):
+                        queue[pattern_id] = position
+
+            reached = set()
+            for pattern_id, first in queue.items():
+                pattern = self.patterns[pattern_id]
+                trip, boarded_at = None, None
+                for position in range(first, len(pattern.stops)):
+                    stop = pattern.stops[position]
+                    if trip is not None:
+                        arrival = pattern.trips[trip][position]
+                        if arrival < min(best[stop], best[target]):
+                            current[stop] = best[stop] = arrival
+                            parent[stop] = ('bus', pattern_id, trip, boarded_at, position)
+                            reached.add(stop)
+
+                    if previous[stop] < math.inf and (
+                            trip is None or previous[stop] <= pattern.trips[trip][position]):
+                        earlier = pattern.earliest_trip(position, previous[stop])
+                        if earlier is not None and earlier != trip:
+                            trip, boarded_at = earlier, position
+
+            marked = set(reached)
+            for stop in reached:
+                for other, minutes in self.footpaths[stop]:
+                    arrival = current[stop] + minutes
+                    if arrival < min(best[other], best[target]):
+                        current[other] = best[other] = arrival
+                        parent[other] = ('walk', stop, minutes)
+                        marked.add(other)
+
+            if not marked:
+                break
+
+        rounds = [k for k in range(len(labels)) if labels[k][target] < math.inf]
+        if not rounds:
+            return None
+        arrival = min(labels[k][target] for k in rounds)
+        k = min(k for k in rounds if labels[k][target] == arrival)
+        legs = self._legs(parents, k, target)
+        if legs and legs[0]['mode'] == 'walk' and 'depart' not in legs[0]:
+            legs[0]['depart'] = depart_after
+            legs[0]['arrive'] = depart_after + legs[0]['minutes']
+        return legs
+
+    def _legs(self, parents, k, stop):
+        legs = []
+        while parents[k][stop] is not None or k > 0:
+            step = parents[k][stop]
+            if step is None:
+                # The label was carried over unchanged from the previous round
+                k -= 1
+                continue
+
+            if step[0] == 'walk':
+                _, origin, minutes = step
+                legs.append({
+                    'mode': 'walk', 'from': self.stop_names[origin], 'to': self.stop_names[stop],
+                    'minutes': minutes
+                })
+                stop = origin
+            else:
+                _, pattern_id, trip, boarded_at, alighted_at = step
+                pattern = self.patterns[pattern_id]
+                origin = pattern.stops[boarded_at]
+                legs.append({
+                    'mode': 'bus', 'route': pattern.route,
+                    'from': self.stop_names[origin], 'to': self.stop_names[stop],
+                    'depart': pattern.trips[trip][boarded_at], 'arrive': pattern.trips[trip][alighted_at]
+                })
+                stop = origin
+                k -= 1
+
+        legs.reverse()
+        return self._timed(legs)
+
+    @staticmethod
+    def _timed(legs):
+        # Walks happen right after the previous leg (or before the next bus for the first leg)
+        for i, leg in enumerate(legs):
+            if leg['mode'] != 'walk':
+                continue
+            if i > 0:
+                leg['depart'] = legs[i - 1]['arrive']
+                leg['arrive'] = leg['depart'] + leg['minutes']
+            elif len(legs) > 1:
+                leg['arrive'] = legs[1]['depart']
+                leg['depart'] = leg['arrive'] - leg['minutes']
+        return legs
@@ -0,0 +1,163 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from bus_data import read_bus_data
+from bus_timetable import TimetableIndex
+from geo_index import GeoIndex
+
+SNAPSHOT_DIR = "cache"
+SNAPSHOT_SUFFIX = ".snapshot"
+
+MAGIC = b"CSBUSSNP"
+FORMAT_VERSION = 1
+
+# Arrays are aligned so they can be viewed in place from the mapping
+ALIGNMENT = 64
+
+_HEADER_SIZE = struct.Struct("<8sQ")
+
+def snapshot_path(source, snapshot_dir=SNAPSHOT_DIR):
+    """Where the snapshot of a source CSV is stored"""
+    return os.path.join(snapshot_dir, os.path.basename(source) + SNAPSHOT_SUFFIX)
+
+def _source_stamp(source):
+    stat = os.stat(source)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def _string_table(strings):
+    encoded = [str(s).encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _strings(blob, offsets):
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+def _arrays(df, index, timetable):
+    arrays = {
+        "latitude": df['Latitude'].to_numpy(dtype=np.float32),
+        "longitude": df['Longitude'].to_numpy(dtype=np.float32),
+        "departure": df['Departure'].to_numpy(dtype=np.int16),
+        "index_points": index.points,
+        "index_order": index.order,
+        "index_rows": index.nodes['rows'],
+        "index_splits": index.nodes['splits'],
+        "timetable_offsets": timetable.offsets,
+        "timetable_departures": timetable.departures,
+        "timetable_routes": timetable.routes,
+    }
+
+    for column, name in (('Bus Route', 'route'), ('Bus Stop', 'stop'), ('Time', 'time')):
+        arrays[f"{name}_codes"] = df[column].cat.codes.to_numpy().astype(np.int32)
+        arrays[f"{name}_names"], arrays[f"{name}_offsets"] = _string_table(df[column].cat.categories)
+
+    for name, strings in (('timetable_stop', timetable.stop_names), ('timetable_route', timetable.route_names)):
+        arrays[f"{name}_names"], arrays[f"{name}_offsets"] = _string_table(strings)
+
+    return arrays
+
+def write_snapshot(source, path):
+    """Parse the source CSV, build its indexes and write them to a snapshot file"""
+    stamp = _source_stamp(source)
+    df = read_bus_data(source)
+    lats = df['Latitude'].to_numpy(dtype=float)
+    lons = df['Longitude'].to_numpy(dtype=float)
+    arrays = _arrays(df, GeoIndex(lats, lons), TimetableIndex.from_dataframe(df))
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "source": stamp,
+        "rows": len(df),
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = -(-(_HEADER_SIZE.size + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER_SIZE.pack(MAGIC, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+class Snapshot:
+    """Bus table, spatial index and timetable viewed from a mapped snapshot file"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_size = _HEADER_SIZE.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a bus snapshot")
+        self.header = json.loads(self._map[_HEADER_SIZE.size:_HEADER_SIZE.size + header_size])
+        if self.header["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has unsupported snapshot version {self.header['version']}")
+
+        data_start = -(-(_HEADER_SIZE.size + header_size) // ALIGNMENT) * ALIGNMENT
+        self.arrays = {}
+        for name, spec in self.header["arrays"].items():
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            array = np.frombuffer(self._map, dtype=spec["dtype"], count=count,
+                                  offset=data_start + spec["offset"])
+            self.arrays[name] = array.reshape(spec["shape"])
+
+        self.data = self._table()
+        self.index = GeoIndex.from_arrays(
+            self.arrays["index_points"], self.arrays["index_order"],
+            {"rows": self.arrays["index_rows"], "splits": self.arrays["index_splits"]}
+        )
+        self.timetable = TimetableIndex(
+            _strings(self.arrays["timetable_stop_names"], self.arrays["timetable_stop_offsets"]),
+            _strings(self.arrays["timetable_route_names"], self.arrays["timetable_route_offsets"]),
+            self.arrays["timetable_offsets"],
+            self.arrays["timetable_departures"],
+            self.arrays["timetable_routes"]
+        )
+
+    def is_fresh(self, source):
+        """Whether the snapshot was built from the current version of source"""
+        return self.header["source"] == _source_stamp(source)
+
+    def _categorical(self, name):
+        categories = _strings(self.arrays[f"{name}_names"], self.arrays[f"{name}_offsets"])
+        return pd.Categorical.from_codes(self.arrays[f"{name}_codes"], categories=categories)
+
+    def _table(self):
+        return pd.DataFrame({
+            'Bus Route': self._categorical("route"),
+            'Bus Stop': self._categorical("stop"),
+            'Time': self._categorical("time"),
+            'Latitude': self.arrays["latitude"],
+            'Longitude': self.arrays["longitude"],
+            'Departure': self.arrays["departure"],
+        }, copy=False)
+
+def load_snapshot(source, snapshot_dir=SNAPSHOT_DIR):
+    """Map the snapshot of source, rebuilding it first if source has changed"""
+    path = snapshot_path(source, snapshot_dir)
+    try:
+        snapshot = Snapshot(path)
+        if snapshot.is_fresh(source):
+            return snapshot
+    except (OSError, ValueError, KeyError):
+        pass
+
+    write_snapshot(source, path)
+    return Snapshot(path)
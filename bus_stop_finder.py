@@ -1,62 +1,256 @@
+import heapq
+import os
+import re
+from datetime import datetime
+from functools import partial
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 from geopy.distance import geodesic
-from geopy.geocoders import Nominatim
+
+from bus_data import BUS_DATA_FILE, format_departure, is_transit_store, load_derived
+from bus_geocoder import get_geocoder
+from bus_gtfs_store import StoreStopIndex, StoreTimetable, build_network
+from bus_journey_planner import TransitNetwork
+from bus_timetable import TimetableIndex
+from geo_index import GeoIndex, haversine_km
+
+# Bus data to serve: the flat CSV, or a SQLite store built with bus_gtfs_store
+BUS_DATA_SOURCE = os.environ.get('BUS_DATA_SOURCE', BUS_DATA_FILE)
+
+# Number of haversine candidates re-ranked with the exact geodesic distance
+GEODESIC_REFINE = 5
+
+def stop_coordinates(df):
+    """Return the stop latitudes and longitudes as float arrays"""
+    if 'Latitude' not in df.columns:
+        # This is a simple placeholder. In a real app, you'd have real coordinates
+        offsets = np.arange(len(df)) * 0.001
+        return 13.0087 + offsets, 80.0034 + offsets
+
+    lats = pd.to_numeric(df['Latitude']).to_numpy(dtype=float)
+    lons = pd.to_numeric(df['Longitude']).to_numpy(dtype=float)
+    return lats, lons
+
+def find_nearest_stop(user_lat, user_lon, df, refine=GEODESIC_REFINE):
+    """Find the stop closest to the user and its distance in km.
+
+    Distances to every stop are computed in one haversine pass; the best
+    ``refine`` candidates are then re-ranked with the exact geodesic distance.
+    Pass ``refine=0`` to skip the re-rank and return the haversine distance.
+    """
+    if len(df) == 0:
+        return None, float('inf')
+
+    lats, lons = stop_coordinates(df)
+    distances = haversine_km(user_lat, user_lon, lats, lons)
+
+    if refine <= 0:
+        best = int(np.argmin(distances))
+        return df.iloc[best], float(distances[best])
+
+    refine = min(refine, len(df))
+    candidates = np.argpartition(distances, refine - 1)[:refine]
+
+    best, min_distance = None, float('inf')
+    for idx in candidates:
+        distance = geodesic((user_lat, user_lon), (lats[idx], lons[idx])).kilometers
+        if distance < min_distance:
+            best, min_distance = idx, distance
+
+    return df.iloc[best], min_distance
+
+# Upper bound on distance-matrix cells held in memory by the batch assignment
+BATCH_MATRIX_CELLS = 2_000_000
+
+def assign_nearest_stops(lats, lons, df, max_cells=BATCH_MATRIX_CELLS):
+    """Assign many points to their nearest stop in one vectorized pass.
+
+    Returns ``(stop_positions, distances_km)`` where ``stop_positions`` are
+    row positions in ``df`` (-1 for points without coordinates). Distances
+    are haversine; the matrix is computed in row chunks so memory stays below
+    ``max_cells`` entries.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    positions = np.full(len(lats), -1, dtype=np.int64)
+    distances = np.full(len(lats), np.nan)
+    if len(df) == 0:
+        return positions, distances
+
+    stop_lats, stop_lons = stop_coordinates(df)
+    chunk = max(1, max_cells // len(df))
+    for start in range(0, len(lats), chunk):
+        end = min(start + chunk, len(lats))
+        matrix = haversine_km(lats[start:end, None], lons[start:end, None], stop_lats, stop_lons)
+        valid = ~np.isnan(lats[start:end]) & ~np.isnan(lons[start:end])
+        if not valid.any():
+            continue
+        best = np.argmin(np.where(np.isnan(matrix), np.inf, matrix), axis=1)
+        rows = np.arange(end - start)
+        positions[start:end] = np.where(valid, best, -1)
+        distances[start:end] = np.where(valid, matrix[rows, best], np.nan)
+
+    return positions, distances
+
+def stop_places(df):
+    """Map stop names to coordinates so the geocoder can resolve them offline"""
+    lats, lons = stop_coordinates(df)
+    places = {}
+    for name, lat, lon in zip(df['Bus Stop'], lats, lons):
+        name = str(name).strip()
+        places.setdefault(name, (lat, lon))
+        # "Vanagaram bus stop" should also answer a search for "Vanagaram"
+        short = re.sub(r"\s+bus (stop|stand|terminal)$", "", name, flags=re.IGNORECASE)
+        places.setdefault(short, (lat, lon))
+    return places
+
+def _build_geo_index(df):
+    return GeoIndex(*stop_coordinates(df))
+
+def _build_stop_index(df, path):
+    get_geocoder().add_places(stop_places(df))
+    if is_transit_store(path):
+        # The store's R*Tree answers the spatial queries
+        return df, StoreStopIndex(path, df)
+    return df, load_derived('geo_index', _build_geo_index, path)
+
+def get_stop_index(path=BUS_DATA_SOURCE):
+    """Return the stop table and its spatial index.
+
+    Both are built once per version of the CSV and shared by every session.
+    For a SQLite transit store the index queries the store's R*Tree.
+    """
+    return load_derived('stop_index', partial(_build_stop_index, path=path), path)
+
+def _with_geodesic(user_lat, user_lon, df, indices):
+    lats, lons = stop_coordinates(df.iloc[indices])
+    results = []
+    for idx, lat, lon in zip(indices, lats, lons):
+        distance = geodesic((user_lat, user_lon), (lat, lon)).kilometers
+        results.append((df.iloc[idx], distance))
+    results.sort(key=lambda item: item[1])
+    return results
+
+def _nearest_distinct(user_lat, user_lon, index, keys, k):
+    # Widen the k-nearest search until k distinct keys (routes, stop names) are found
+    want = k * 4
+    while True:
+        indices, _ = index.nearest(user_lat, user_lon, want)
+        chosen, seen = [], set()
+        for idx in indices:
+            if keys[idx] not in seen:
+                seen.add(keys[idx])
+                chosen.append(idx)
+        if len(chosen) >= k or len(indices) == len(index):
+            return chosen[:k]
+        want *= 4
+
+def find_nearest_stops(user_lat, user_lon, df, index, k=3, distinct_routes=True):
+    """Return up to k (stop, distance_km) pairs closest to the user.
+
+    With ``distinct_routes`` only the closest stop of each route is kept, so
+    the result lists k different routes when the table has that many.
+    """
+    if not distinct_routes:
+        indices, _ = index.nearest(user_lat, user_lon, k)
+        return _with_geodesic(user_lat, user_lon, df, indices)
+
+    chosen = _nearest_distinct(user_lat, user_lon, index, df['Bus Route'].to_numpy(), k)
+    return _with_geodesic(user_lat, user_lon, df, chosen)
+
+def find_stops_within(user_lat, user_lon, df, index, radius_km):
+    """Return all (stop, distance_km) pairs within radius_km of the user, nearest first"""
+    indices, distances = index.within(user_lat, user_lon, radius_km)
+    return [(df.iloc[idx], float(distance)) for idx, distance in zip(indices, distances)]
+
+def get_timetable(path=BUS_DATA_SOURCE):
+    """Return the per-stop departure index, shared by every session"""
+    if is_transit_store(path):
+        return load_derived('timetable', lambda df: StoreTimetable(path), path)
+    return load_derived('timetable', TimetableIndex.from_dataframe, path)
+
+def next_departures_near(user_lat, user_lon, after, n=5, stops=3, path=BUS_DATA_SOURCE):
+    """Return the next n departures after ``after`` from the closest stops.
+
+    ``after`` is in minutes since midnight. Each result is a dict with the
+    stop, route, departure (minutes since midnight) and distance_km.
+    """
+    df, index = get_stop_index(path)
+    timetable = get_timetable(path)
+    names = df['Bus Stop'].to_numpy()
+
+    nearest = _nearest_distinct(user_lat, user_lon, index, names, stops)
+    per_stop = []
+    for stop, distance in _with_geodesic(user_lat, user_lon, df, nearest):
+        name = stop['Bus Stop']
+        per_stop.append([
+            (departure, route, name, distance)
+            for departure, route in timetable.next_departures(name, after, n)
+        ])
+
+    return [
+        {'stop': name, 'route': route, 'departure': departure, 'distance_km': distance}
+        for departure, route, name, distance in heapq.merge(*per_stop)
+    ][:n]
+
+def get_transit_network(path=BUS_DATA_SOURCE):
+    """Return the route graph and walking transfers, shared by every session"""
+    if is_transit_store(path):
+        return load_derived('transit_network', lambda df: build_network(path), path)
+    return load_derived('transit_network', TransitNetwork.from_dataframe, path)
+
+def plan_journey(origin, destination, after, path=BUS_DATA_SOURCE):
+    """Plan the earliest-arriving journey between two stops after ``after`` minutes"""
+    return get_transit_network(path).plan(origin, destination, after)
 
 def show():
     st.title("🚍 Find Your Nearest Bus Stop")
     st.markdown("### Enter your location to discover the closest bus stop and route!")
 
-    # Load the CSV with coordinates
-    df = pd.read_csv('bus_routes_with_coordinates.csv')
+    # Load the CSV with coordinates and its spatial index (shared by all sessions)
+    df, stop_index = get_stop_index()
 
     # User inputs a location
     user_location = st.text_input("Enter your location (e.g., Vanagaram):")
+    if "bus_leave_after" not in st.session_state:
+        st.session_state["bus_leave_after"] = datetime.now().time().replace(second=0, microsecond=0)
+    leave_after = st.time_input("Leaving after", key="bus_leave_after")
 
     def get_coordinates(location):
-        geolocator = Nominatim(user_agent="bus_stop_locator")
         try:
-            location_info = geolocator.geocode(location)
-            if location_info:
-                return (location_info.latitude, location_info.longitude)
-            else:
-                return None
+            return get_geocoder().geocode(location)
         except Exception as e:
             st.error(f"Error finding location: {e}")
             return None
 
-    def find_nearest_stop(user_lat, user_lon, df):
-        # Add default coordinates if they don't exist
-        if 'Latitude' not in df.columns:
-            # This is a simple placeholder. In a real app, you'd have real coordinates
-            df['Latitude'] = [13.0087 + (i * 0.001) for i in range(len(df))]
-            df['Longitude'] = [80.0034 + (i * 0.001) for i in range(len(df))]
-        
-        df['Latitude'] = df['Latitude'].astype(float)
-        df['Longitude'] = df['Longitude'].astype(float)
-
-        min_distance = float('inf')
-        nearest_stop = None
-
-        for _, row in df.iterrows():
-            stop_coords = (row['Latitude'], row['Longitude'])
-            distance = geodesic((user_lat, user_lon), stop_coords).kilometers
-
-            if distance < min_distance:
-                min_distance = distance
-                nearest_stop = row
-
-        return nearest_stop, min_distance
-
     if st.button("🔎 Find Nearest Bus Stop"):
         if user_location:
             coords = get_coordinates(user_location)
             if coords:
                 user_lat, user_lon = coords
-                nearest_stop, distance = find_nearest_stop(user_lat, user_lon, df)
-                if nearest_stop is not None:
+                nearest_stops = find_nearest_stops(user_lat, user_lon, df, stop_index, k=3)
+                if nearest_stops:
+                    nearest_stop, distance = nearest_stops[0]
                     st.success(
                         f"### 🚉 Nearest Bus Stop:\n{nearest_stop['Bus Stop']}\n on route  \n {nearest_stop['Bus Route']} \n📍 Distance:  {distance: .2f} km away")
+
+                    if len(nearest_stops) > 1:
+                        st.markdown("#### 🚌 Other nearby routes")
+                        for stop, stop_distance in nearest_stops[1:]:
+                            st.write(f"• **{stop['Bus Stop']}** on route {stop['Bus Route']} ({stop_distance:.2f} km)")
+
+                    after = leave_after.hour * 60 + leave_after.minute
+                    departures = next_departures_near(user_lat, user_lon, after)
+                    st.markdown("#### 🕒 Next departures")
+                    if departures:
+                        for departure in departures:
+                            st.write(
+                                f"• **{format_departure(departure['departure'])}** - {departure['route']} "
+                                f"from {departure['stop']} ({departure['distance_km']:.2f} km)")
+                    else:
+                        st.info("No more departures from the nearby stops today.")
                 else:
                     st.warning("No bus stops found. Please try another location.")
             else:
@@ -64,6 +258,33 @@ def show():
         else:
             st.info("Please enter a valid location.")
 
+    st.markdown("---")
+    st.markdown("### 🧭 Plan a Journey")
+    network = get_transit_network()
+    stop_names = sorted(network.stop_names)
+    col_from, col_to = st.columns(2)
+    with col_from:
+        origin = st.selectbox("From stop", stop_names, key="journey_from")
+    with col_to:
+        destination = st.selectbox("To stop", stop_names, key="journey_to")
+
+    if st.button("🚌 Plan Journey"):
+        after = leave_after.hour * 60 + leave_after.minute
+        legs = plan_journey(origin, destination, after)
+        if legs is None:
+            st.warning("No connection found after the selected time.")
+        elif not legs:
+            st.info("You're already at this stop.")
+        else:
+            st.success(f"Arrive at {destination} by {format_departure(legs[-1]['arrive'])}")
+            for leg in legs:
+                if leg['mode'] == 'bus':
+                    st.write(
+                        f"🚌 **{format_departure(leg['depart'])}** take {leg['route']} "
+                        f"from {leg['from']} to {leg['to']} (arrive {format_departure(leg['arrive'])})")
+                else:
+                    st.write(f"🚶 Walk {leg['minutes']} min from {leg['from']} to {leg['to']}")
+
 if __name__ == "__main__":
     # Setup for standalone run
     st.set_page_config(page_title="Bus Stop Finder", page_icon="🚍")
@@ -0,0 +1,61 @@
+import numpy as np
+
+from bus_data import NO_DEPARTURE
+
+class TimetableIndex:
+    """Departure times grouped by stop and sorted for binary search.
+
+    All departures live in flat arrays ordered by (stop, time); ``offsets``
+    marks where each stop's block starts, so a "next departure after T"
+    lookup is a single ``searchsorted`` over that stop's block.
+    """
+
+    def __init__(self, stop_names, route_names, offsets, departures, routes):
+        self.stop_names = list(stop_names)
+        self.route_names = list(route_names)
+        self.offsets = offsets
+        self.departures = departures
+        self.routes = routes
+        self._stop_ids = {name: i for i, name in enumerate(self.stop_names)}
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build the index from a table returned by ``bus_data.load_bus_data``"""
+        # Rows without a stop or route name can't be looked up
+        df = df[(df['Departure'] != NO_DEPARTURE) & df['Bus Stop'].notna() & df['Bus Route'].notna()]
+        stops = df['Bus Stop'].astype('category')
+        routes = df['Bus Route'].astype('category')
+
+        stop_codes = stops.cat.codes.to_numpy()
+        departures = df['Departure'].to_numpy(dtype=np.int16)
+        order = np.lexsort((departures, stop_codes))
+
+        n_stops = len(stops.cat.categories)
+        counts = np.bincount(stop_codes, minlength=n_stops)
+        offsets = np.zeros(n_stops + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        return cls(
+            stops.cat.categories,
+            routes.cat.categories,
+            offsets,
+            departures[order],
+            routes.cat.codes.to_numpy()[order].astype(np.int32)
+        )
+
+    def __contains__(self, stop):
+        return stop in self._stop_ids
+
+    def next_departures(self, stop, after, n=5):
+        """Return up to n (departure_minutes, route) pairs from stop at or after ``after``"""
+        stop_id = self._stop_ids.get(stop)
+        if stop_id is None:
+            return []
+
+        start, end = self.offsets[stop_id], self.offsets[stop_id + 1]
+        first = start + int(np.searchsorted(self.departures[start:end], after, side='left'))
+        last = min(first + n, end)
+        return [
+            (int(self.departures[i]), self.route_names[self.routes[i]])
+            for i in range(first, last)
+        ]
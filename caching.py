@@ -0,0 +1,42 @@
+import functools
+import json
+import os
+import threading
+
+def write_atomic(path, data):
+    """Write bytes or text to path through a temporary file, creating its folder.
+
+    Readers never see a half-written file. Disk caches are best effort, so a
+    failed write returns False instead of raising; the caller still has the
+    value in memory.
+    """
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if isinstance(data, str):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+        else:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        return False
+    return True
+
+def write_json_atomic(path, value):
+    """Write value to path as JSON with write_atomic"""
+    return write_atomic(path, json.dumps(value))
+
+def shared_instance(factory):
+    """Decorate a factory so it runs once and every session in the process gets its result"""
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(factory)
+    def get():
+        with lock:
+            if not instance:
+                instance.append(factory())
+            return instance[0]
+    return get
@@ -0,0 +1,66 @@
+import numpy as np
+
+from geo_index import EARTH_RADIUS_M, haversine_km
+
+# Distance modes for distance_matrix. Both treat the Earth as a sphere, so
+# against the WGS-84 geodesic (geopy's default) they are off by up to about
+# 0.5% depending on latitude and heading. Across this campus (about 13 N,
+# locations at most 760 m apart) that is at most 2.3 m.
+#
+# "equirectangular" projects both points onto a plane through their mean
+# latitude. Its extra error over haversine grows with the cube of the
+# distance: under 0.001 mm across campus and about 0.3 mm at 10 km. It is
+# the cheaper of the two, a handful of array operations.
+#
+# "haversine" is exact on the sphere at any distance.
+METHODS = ("equirectangular", "haversine")
+
+def as_points(points):
+    """(lats, lons) arrays in degrees from one (lat, lon) pair or a sequence of them"""
+    array = np.asarray(points, dtype=float).reshape(-1, 2)
+    return array[:, 0], array[:, 1]
+
+def distance_matrix(origins, destinations, method="equirectangular"):
+    """Distances in metres from every origin (rows) to every destination (columns)"""
+    lat1, lon1 = (a[:, None] for a in as_points(origins))
+    lat2, lon2 = (a[None, :] for a in as_points(destinations))
+
+    if method == "equirectangular":
+        lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+        x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+        y = lat2 - lat1
+        return EARTH_RADIUS_M * np.hypot(x, y)
+    if method == "haversine":
+        return haversine_km(lat1, lon1, lat2, lon2) * 1000
+    raise ValueError(f"Unknown distance method {method!r}; expected one of {METHODS}")
+
+def convex_hull(points):
+    """Convex hull of (lat, lon) points, counter-clockwise, without repeating the first point"""
+    unique = sorted(set(map(tuple, points)), key=lambda p: (p[1], p[0]))
+    if len(unique) < 3:
+        return unique
+
+    def cross(o, a, b):
+        return (a[1] - o[1]) * (b[0] - o[0]) - (a[0] - o[0]) * (b[1] - o[1])
+
+    # Andrew's monotone chain with longitude as x and latitude as y
+    lower, upper = [], []
+    for p in unique:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(unique):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+def bearing_matrix(origins, destinations):
+    """Initial bearings in degrees [0, 360) from every origin (rows) to every destination (columns)"""
+    lat1, lon1 = (np.radians(a)[:, None] for a in as_points(origins))
+    lat2, lon2 = (np.radians(a)[None, :] for a in as_points(destinations))
+
+    d_lon = lon2 - lon1
+    x = np.sin(d_lon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(d_lon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
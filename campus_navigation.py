@@ -1,10 +1,61 @@
 import streamlit as st
 import folium
-from streamlit_folium import st_folium
+import copy
 import math
+import os
+import threading
+import numpy as np
 from geopy.distance import geodesic
 import streamlit.components.v1 as components
 import requests
+from requests.adapters import HTTPAdapter
+
+from campus_registry import load_registry
+from campus_geometry import bearing_matrix, convex_hull, distance_matrix
+from geo_index import WALKING_SPEED, GeoIndex
+from live_tracking import LiveTracker
+from map_cache import get_map_cache, route_fingerprint
+from route_cache import get_route_cache, route_key
+from route_matrix import load_route_matrix
+from route_polyline import remaining_distance, simplify_for_zoom
+from route_prefetch import pending_route, prefetch_routes
+from routing_client import ROUTING_WORKERS, RoutingClient
+from tile_proxy import TILE_SOURCES
+from walking_graph import MAX_SNAP_METERS, load_walking_graph
+from walking_tour import optimise_tour
+
+# "local" routes on the offline campus path graph and falls back to OSRM
+# for trips off the graph; "osrm" always uses the public OSRM server
+ROUTING_BACKEND = os.environ.get('CAMPUS_ROUTING_BACKEND', 'local')
+
+# OSRM server; point it at osrm_stub.py to reproduce slow or failing backends offline
+OSRM_URL = os.environ.get('CAMPUS_OSRM_URL', 'http://router.project-osrm.org').rstrip('/')
+
+# Zoom the campus map opens at
+MAP_ZOOM = 16
+
+# Base URL of tile_proxy.py as browsers reach it; unset loads tiles from the
+# remote servers directly
+TILE_SERVER_URL = os.environ.get('CAMPUS_TILE_URL')
+
+# Route lines keep enough points to look exact when zoomed in this far
+ROUTE_DETAIL_ZOOM = 18
+
+# GPS fixes this close to a named location or path node start from it, so
+# nearby fixes share precomputed and cached routes. A reported accuracy
+# widens or narrows the radius within the min/max bounds
+SNAP_RADIUS_M = 25
+MIN_SNAP_RADIUS_M = 10
+MAX_SNAP_RADIUS_M = 60
+
+# OSRM request timeout in seconds
+OSRM_TIMEOUT = 10
+
+# One pooled HTTP session shared by all routing workers
+osrm_session = requests.Session()
+osrm_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=ROUTING_WORKERS)
+osrm_session.mount('http://', osrm_adapter)
+osrm_session.mount('https://', osrm_adapter)
 
 # Custom CSS for better UI
 st.markdown("""
@@ -40,31 +91,16 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Campus locations with coordinates
-CAMPUS_LOCATIONS = {
-    "REC Ground": (13.008583, 80.004445),
-    "REC Basketball Court": (13.009092, 80.004046),
-    "Xerox": (13.008434, 80.003711),
-    "B Block": (13.009143, 80.003212),
-    "Aircraft": (13.009475, 80.003025),
-    "REC Main Gate": (13.010573, 80.002384),
-    "Architecture Block": (13.008279, 80.001577),
-    "Heka": (13.007728, 80.002058),
-    "D Block": (13.007839, 80.002421),
-    "Indoor Auditorium": (13.008360, 80.005498),
-    "Cafe Coffee Day": (13.008654, 80.005464),
-    "Library Block": (13.008949, 80.005462),
-    "Transport Office": (13.009275, 80.005503),
-    "Tech Lounge": (13.009452, 80.005065),
-    "A Block": (13.009449, 80.004216),
-    "Ladies Hostel": (13.007242, 80.005592),
-    "Boys Mess": (13.007440, 80.004371),
-    "Hut Cafe": (13.008207, 80.003396),
-    "REC Cafe": (13.008335, 80.002526),
-    "Mechanical Block": (13.007880, 80.002729),
-    "Solid Mechanics Lab": (13.008224, 80.002942),
-    "Fluid Mechanics Lab": (13.008253, 80.003116),
-    "Students Parking": (13.012133, 80.000642),
-}
+# Named places, aliases and the type-ahead index live in campus_locations.json
+PLACE_REGISTRY = load_registry()
+CAMPUS_LOCATIONS = PLACE_REGISTRY.locations
+
+# Location coordinates as one array; row i is LOCATION_NAMES[i], and
+# LOCATION_POSITIONS maps names back to rows (and select box indices)
+LOCATION_NAMES = PLACE_REGISTRY.names
+LOCATION_POSITIONS = PLACE_REGISTRY.positions
+LOCATION_COORDS = np.array([CAMPUS_LOCATIONS[name] for name in LOCATION_NAMES]).reshape(-1, 2)
+LOCATION_INDEX = GeoIndex(LOCATION_COORDS[:, 0], LOCATION_COORDS[:, 1])
 
 # Initialize session state
 if 'user_location' not in st.session_state:
@@ -73,219 +109,30 @@ if 'location_acquired' not in st.session_state:
     st.session_state.location_acquired = False
 if 'use_live_location' not in st.session_state:
     st.session_state.use_live_location = False
+if 'location_accuracy' not in st.session_state:
+    st.session_state.location_accuracy = None
+if 'location_requests' not in st.session_state:
+    st.session_state.location_requests = 0
+if 'locating' not in st.session_state:
+    st.session_state.locating = False
 
-def get_location_component():
-    """Component to get user's live location"""
-    location_html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 20px;
-                margin: 0;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                min-height: 100vh;
-            }
-            .container {
-                background: rgba(255, 255, 255, 0.15);
-                backdrop-filter: blur(10px);
-                padding: 30px;
-                border-radius: 20px;
-                text-align: center;
-                max-width: 500px;
-                box-shadow: 0 8px 32px rgba(0, 0, 0, 0.2);
-            }
-            .icon {
-                font-size: 64px;
-                margin-bottom: 20px;
-                animation: pulse 2s infinite;
-            }
-            @keyframes pulse {
-                0%, 100% { transform: scale(1); }
-                50% { transform: scale(1.1); }
-            }
-            .spinner {
-                border: 4px solid rgba(255, 255, 255, 0.3);
-                border-top: 4px solid white;
-                border-radius: 50%;
-                width: 60px;
-                height: 60px;
-                animation: spin 1s linear infinite;
-                margin: 20px auto;
-            }
-            @keyframes spin {
-                0% { transform: rotate(0deg); }
-                100% { transform: rotate(360deg); }
-            }
-            .status {
-                font-size: 18px;
-                margin: 20px 0;
-                line-height: 1.6;
-            }
-            .coords {
-                background: rgba(0, 0, 0, 0.3);
-                padding: 15px;
-                border-radius: 10px;
-                font-family: monospace;
-                margin-top: 20px;
-                font-size: 14px;
-            }
-            .button {
-                background: white;
-                color: #667eea;
-                border: none;
-                padding: 12px 30px;
-                border-radius: 25px;
-                font-size: 16px;
-                font-weight: bold;
-                cursor: pointer;
-                margin-top: 20px;
-                transition: all 0.3s;
-            }
-            .button:hover {
-                transform: scale(1.05);
-                box-shadow: 0 5px 15px rgba(0, 0, 0, 0.3);
-            }
-            .error {
-                background: rgba(255, 107, 107, 0.3);
-                padding: 15px;
-                border-radius: 10px;
-                margin-top: 20px;
-            }
-            .success {
-                color: #00ff88;
-                font-size: 72px;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="icon" id="icon">📍</div>
-            <div class="status" id="status">Requesting your location...</div>
-            <div class="spinner" id="spinner"></div>
-            <div id="result"></div>
-        </div>
-
-        <script>
-            const statusEl = document.getElementById('status');
-            const spinnerEl = document.getElementById('spinner');
-            const resultEl = document.getElementById('result');
-            const iconEl = document.getElementById('icon');
-
-            function getLocation() {
-                if (!navigator.geolocation) {
-                    showError('Geolocation not supported by your browser');
-                    return;
-                }
-
-                statusEl.textContent = '🔔 Please allow location access';
-
-                navigator.geolocation.getCurrentPosition(
-                    position => {
-                        const lat = position.coords.latitude;
-                        const lng = position.coords.longitude;
-                        const acc = Math.round(position.coords.accuracy);
-
-                        spinnerEl.style.display = 'none';
-                        iconEl.innerHTML = '✅';
-                        iconEl.className = 'icon success';
-                        statusEl.textContent = 'Location Acquired Successfully!';
-
-                        resultEl.innerHTML = `
-                            <div class="coords">
-                                <div><strong>Latitude:</strong> ${lat.toFixed(6)}</div>
-                                <div><strong>Longitude:</strong> ${lng.toFixed(6)}</div>
-                                <div><strong>Accuracy:</strong> ±${acc}m</div>
-                            </div>
-                        `;
-
-                        // Send to Streamlit
-                        const data = {
-                            latitude: lat,
-                            longitude: lng,
-                            accuracy: acc
-                        };
-
-                        window.parent.postMessage({
-                            type: 'streamlit:setComponentValue',
-                            value: data
-                        }, '*');
-
-                        localStorage.setItem('campus_location', JSON.stringify(data));
-
-                        setTimeout(() => {
-                            statusEl.textContent = 'Redirecting to navigation...';
-                            window.parent.postMessage({
-                                type: 'streamlit:rerun'
-                            }, '*');
-                        }, 2000);
-                    },
-                    error => {
-                        spinnerEl.style.display = 'none';
-                        iconEl.innerHTML = '❌';
-                        
-                        let msg = '';
-                        let help = '';
-                        
-                        switch(error.code) {
-                            case error.PERMISSION_DENIED:
-                                msg = 'Location Permission Denied';
-                                help = `
-                                    <strong>Enable Location Access:</strong><br><br>
-                                    <strong>📱 Android Chrome:</strong><br>
-                                    Settings → Site settings → Location → Allow<br><br>
-                                    <strong>🍎 iOS Safari:</strong><br>
-                                    Settings → Privacy → Location Services → Safari → While Using<br><br>
-                                    <strong>💻 Desktop:</strong><br>
-                                    Click lock icon in address bar → Location → Allow
-                                `;
-                                break;
-                            case error.POSITION_UNAVAILABLE:
-                                msg = 'Location Unavailable';
-                                help = 'Please enable GPS on your device';
-                                break;
-                            case error.TIMEOUT:
-                                msg = 'Request Timeout';
-                                help = 'Please try again';
-                                break;
-                        }
-                        
-                        statusEl.textContent = msg;
-                        resultEl.innerHTML = `<div class="error">${help}</div>`;
-                        
-                        const btn = document.createElement('button');
-                        btn.className = 'button';
-                        btn.textContent = '🔄 Try Again';
-                        btn.onclick = () => location.reload();
-                        resultEl.appendChild(btn);
-                    },
-                    {
-                        enableHighAccuracy: true,
-                        timeout: 15000,
-                        maximumAge: 0
-                    }
-                );
-            }
+# Bidirectional component: it returns {latitude, longitude, accuracy} to the
+# script in the same session once the browser has a fix
+_location_component = components.declare_component(
+    "campus_location",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "location_component")
+)
 
-            function showError(msg) {
-                spinnerEl.style.display = 'none';
-                iconEl.innerHTML = '❌';
-                statusEl.textContent = msg;
-            }
+def get_location_component(key=None):
+    """Component to get user's live location; returns the fix, or None until the browser has one"""
+    return _location_component(key=key, default=None)
 
-            getLocation();
-        </script>
-    </body>
-    </html>
-    """
-    return components.html(location_html, height=600)
+def store_live_location(coords, accuracy_m=None):
+    """Use a GPS fix, and the accuracy the browser reported for it, as this session's live location"""
+    st.session_state.user_location = tuple(coords)
+    st.session_state.location_accuracy = accuracy_m
+    st.session_state.location_acquired = True
+    st.session_state.use_live_location = True
 
 def calculate_distance(point1, point2):
     """Calculate distance between two coordinates in meters"""
@@ -303,88 +150,308 @@ def calculate_bearing(point1, point2):
     bearing = math.degrees(math.atan2(x, y))
     return (bearing + 360) % 360
 
+def distances_to_locations(origins, method='equirectangular'):
+    """Metres from one or many (lat, lon) origins to every campus location.
+
+    One row per origin, one column per LOCATION_NAMES entry. See
+    campus_geometry for the error of each method.
+    """
+    return distance_matrix(origins, LOCATION_COORDS, method)
+
+def bearings_to_locations(origins):
+    """Bearings in degrees from one or many origins to every campus location, laid out like distances_to_locations"""
+    return bearing_matrix(origins, LOCATION_COORDS)
+
+def locations_by_distance(origin, limit=None, method='equirectangular'):
+    """(name, distance_m, bearing) of campus locations around origin, closest first"""
+    distances = distances_to_locations(origin, method)[0]
+    bearings = bearings_to_locations(origin)[0]
+    order = np.argsort(distances, kind='stable')[:limit]
+    return [(LOCATION_NAMES[i], float(distances[i]), float(bearings[i])) for i in order]
+
+def snap_radius(accuracy_m=None):
+    """Snapping radius in metres for a GPS fix with the given reported accuracy"""
+    if accuracy_m is None:
+        return SNAP_RADIUS_M
+    return min(max(accuracy_m, MIN_SNAP_RADIUS_M), MAX_SNAP_RADIUS_M)
+
+def snap_location(coords, accuracy_m=None):
+    """Snap a GPS fix to the nearest named location, else the nearest walking-graph node.
+
+    Returns (name, coords, offset_m): name is None unless a named location is
+    within the snapping radius; coords are the location's, the path node's or
+    the fix itself when neither is close enough.
+    """
+    radius = snap_radius(accuracy_m)
+    indices, distances = LOCATION_INDEX.nearest(coords[0], coords[1], 1)
+    if len(indices) and distances[0] * 1000 <= radius:
+        name = LOCATION_NAMES[indices[0]]
+        return name, CAMPUS_LOCATIONS[name], float(distances[0]) * 1000
+    
+    graph = load_walking_graph()
+    if graph is not None and len(graph):
+        node, offset = graph.nearest_node(coords)
+        if offset <= radius:
+            return None, graph.node_coords(node), offset
+    
+    return None, tuple(coords), 0.0
+
+def search_locations(query, limit=5):
+    """Campus location names matching a name, alias ("SM Lab"), prefix or misspelling"""
+    return PLACE_REGISTRY.search(query, limit)
+
+def choose_quick_dest(name):
+    """Quick Access button callback: make name the destination"""
+    st.session_state.quick_dest = name
+    st.session_state.dest_search = ""
+
 def get_direction(bearing):
     """Convert bearing to direction"""
     directions = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
     idx = round(bearing / 45) % 8
     return directions[idx]
 
-def get_route(start_coords, end_coords):
-    """Get walking route from OSRM (OpenStreetMap routing)"""
-    try:
-        url = f"http://router.project-osrm.org/route/v1/foot/{start_coords[1]},{start_coords[0]};{end_coords[1]},{end_coords[0]}"
-        params = {
-            'overview': 'full',
-            'geometries': 'geojson',
-            'steps': 'true'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
+def straight_line_route(start_coords, end_coords):
+    """Fallback route: a straight line at walking pace"""
+    distance = geodesic(start_coords, end_coords).meters
+    return {
+        'route_points': [start_coords, end_coords],
+        'distance': distance,
+        'duration': distance / WALKING_SPEED,
+        'steps': [],
+        'fallback': True
+    }
+
+def fetch_osrm_route(start_coords, end_coords, profile='foot'):
+    """Fetch a route from OSRM; returns None when OSRM has no route and raises when it fails"""
+    url = f"{OSRM_URL}/route/v1/{profile}/{start_coords[1]},{start_coords[0]};{end_coords[1]},{end_coords[0]}"
+    params = {
+        'overview': 'full',
+        'geometries': 'geojson',
+        'steps': 'true'
+    }
+    
+    response = osrm_session.get(url, params=params, timeout=OSRM_TIMEOUT)
+    if response.status_code >= 500:
+        response.raise_for_status()
+    
+    if response.status_code == 200:
+        data = response.json()
         
-        if response.status_code == 200:
-            data = response.json()
+        if data.get('routes') and len(data['routes']) > 0:
+            route = data['routes'][0]
+            coordinates = route['geometry']['coordinates']
+            route_points = [(coord[1], coord[0]) for coord in coordinates]
             
-            if data.get('routes') and len(data['routes']) > 0:
-                route = data['routes'][0]
-                coordinates = route['geometry']['coordinates']
-                route_points = [(coord[1], coord[0]) for coord in coordinates]
-                
-                distance = route['distance']
-                duration = route['duration']
-                
-                steps = []
-                if 'legs' in route and len(route['legs']) > 0:
-                    for step in route['legs'][0].get('steps', []):
-                        maneuver = step.get('maneuver', {})
-                        instruction = maneuver.get('type', 'continue')
-                        modifier = maneuver.get('modifier', '')
-                        step_distance = step.get('distance', 0)
-                        
-                        if instruction != 'arrive':
-                            steps.append({
-                                'instruction': f"{instruction} {modifier}".strip(),
-                                'distance': step_distance
-                            })
-                
-                return {
-                    'route_points': route_points,
-                    'distance': distance,
-                    'duration': duration,
-                    'steps': steps
-                }
-        
-        return {
-            'route_points': [start_coords, end_coords],
-            'distance': geodesic(start_coords, end_coords).meters,
-            'duration': geodesic(start_coords, end_coords).meters / 1.4,
-            'steps': []
-        }
-        
-    except Exception as e:
-        return {
-            'route_points': [start_coords, end_coords],
-            'distance': geodesic(start_coords, end_coords).meters,
-            'duration': geodesic(start_coords, end_coords).meters / 1.4,
-            'steps': []
-        }
-
-def create_map(source_coords, destination_coords, source_name, dest_name):
-    """Create folium map with real road route"""
-    
-    route_data = get_route(source_coords, destination_coords)
-    route_points = route_data['route_points']
-    
-    center_lat = (source_coords[0] + destination_coords[0]) / 2
-    center_lng = (source_coords[1] + destination_coords[1]) / 2
+            distance = route['distance']
+            duration = route['duration']
+            
+            steps = []
+            if 'legs' in route and len(route['legs']) > 0:
+                for step in route['legs'][0].get('steps', []):
+                    maneuver = step.get('maneuver', {})
+                    instruction = maneuver.get('type', 'continue')
+                    modifier = maneuver.get('modifier', '')
+                    step_distance = step.get('distance', 0)
+                    
+                    if instruction != 'arrive':
+                        steps.append({
+                            'instruction': f"{instruction} {modifier}".strip(),
+                            'distance': step_distance
+                        })
+            
+            return {
+                'route_points': route_points,
+                'distance': distance,
+                'duration': duration,
+                'steps': steps
+            }
     
+    return None
+
+def _store_route(key, route):
+    get_route_cache().put(key, route)
+
+# OSRM calls go through a circuit breaker and a latency budget; answers that
+# arrive after the budget are cached for the next render
+osrm_client = RoutingClient(fetch_osrm_route, on_result=_store_route)
+
+def get_local_route(start_coords, end_coords):
+    """Route on the offline campus path graph; None if a point is off the graph"""
+    graph = load_walking_graph()
+    if graph is None:
+        return None
+    return graph.route(start_coords, end_coords)
+
+def get_route(start_coords, end_coords, profile='foot'):
+    """Get walking route from the campus path graph or OSRM (OpenStreetMap routing)"""
+    # Reuse a background prefetch of the same route instead of requesting it twice
+    pending = pending_route(start_coords, end_coords, profile)
+    if pending is not None:
+        try:
+            return pending.result(timeout=OSRM_TIMEOUT)
+        except Exception:
+            pass
+    
+    return compute_route(start_coords, end_coords, profile)
+
+def compute_route(start_coords, end_coords, profile='foot'):
+    """Resolve a route through the local graph, the route cache and OSRM"""
+    if ROUTING_BACKEND == 'local' and profile == 'foot':
+        route = get_local_route(start_coords, end_coords)
+        if route is not None:
+            return route
+    
+    cache = get_route_cache()
+    key = route_key(start_coords, end_coords, profile)
+    route = cache.get(key)
+    if route is not None:
+        return route
+    
+    # The client caches OSRM's answer itself, even when it misses the budget.
+    # Fallbacks aren't cached so the real route is used once OSRM answers
+    route = osrm_client.route(start_coords, end_coords, profile)
+    if route is None:
+        return straight_line_route(start_coords, end_coords)
+    return route
+
+def get_named_route(source_name, dest_name):
+    """Precomputed route between two CAMPUS_LOCATIONS, or None if it isn't in the matrix"""
+    matrix = load_route_matrix()
+    if matrix is None or source_name not in CAMPUS_LOCATIONS or dest_name not in CAMPUS_LOCATIONS:
+        return None
+    return matrix.lookup(source_name, dest_name, CAMPUS_LOCATIONS[source_name], CAMPUS_LOCATIONS[dest_name])
+
+def needs_osrm(start_coords, end_coords, profile='foot'):
+    """Whether compute_route would have to ask OSRM for this route"""
+    if ROUTING_BACKEND == 'local' and profile == 'foot':
+        graph = load_walking_graph()
+        if graph is not None and len(graph) and all(
+            graph.nearest_node(coords)[1] <= MAX_SNAP_METERS for coords in (start_coords, end_coords)
+        ):
+            return False
+    return get_route_cache().get(route_key(start_coords, end_coords, profile)) is None
+
+def prefetch_quick_routes(source_name, source_coords, destinations):
+    """Warm the route cache for Quick Access destinations in the background.
+
+    Local graph routes are quick to compute and aren't cached, so only
+    routes that would go to OSRM are prefetched.
+    """
+    pending = [
+        CAMPUS_LOCATIONS[dest] for dest in destinations
+        if dest != source_name and get_named_route(source_name, dest) is None
+        and needs_osrm(source_coords, CAMPUS_LOCATIONS[dest])
+    ]
+    if pending:
+        prefetch_routes(source_coords, pending, compute_route)
+
+def isochrone(source_name, source_coords, minutes):
+    """Campus locations reachable within minutes of walking, and the area they cover.
+
+    Runs one bounded Dijkstra sweep over the walking graph. Without a graph,
+    named sources use the route matrix instead. Returns a dict with the
+    walking budget in metres, the reachable locations as (name, metres)
+    closest first, and the reachable area as a polygon of (lat, lon) points.
+    """
+    limit = minutes * 60 * WALKING_SPEED
+    reached, points = [], []
+    
+    graph = load_walking_graph()
+    source_node, source_gap = graph.nearest_node(source_coords) if graph is not None and len(graph) else (None, math.inf)
+    if source_gap <= MAX_SNAP_METERS:
+        budget = max(limit - source_gap, 0.0)
+        distances = graph.distances_within(source_node, budget)
+        for name in LOCATION_NAMES:
+            node, gap = graph.nearest_node(CAMPUS_LOCATIONS[name])
+            if name != source_name and node in distances and source_gap + distances[node] + gap <= limit:
+                reached.append((name, source_gap + distances[node] + gap))
+        points = graph.reachable_points(distances, budget)
+    else:
+        matrix = load_route_matrix()
+        if matrix is not None and source_name in CAMPUS_LOCATIONS:
+            for name in LOCATION_NAMES:
+                route = get_named_route(source_name, name) if name != source_name else None
+                if route is not None and route['distance'] <= limit:
+                    reached.append((name, route['distance']))
+                    points.extend(route['route_points'])
+    
+    reached.sort(key=lambda item: item[1])
+    return {
+        'minutes': minutes,
+        'distance': limit,
+        'locations': reached,
+        'area': convex_hull(points + [tuple(source_coords)]) if points else []
+    }
+
+def plan_tour(start_name, start_coords, stop_names, return_to_start=False):
+    """Shortest order to walk from start through every stop, as one combined route.
+
+    Leg lengths come from the route matrix (or the route cache / walking
+    graph for stops it doesn't cover), and the order from a nearest-neighbour
+    tour improved with 2-opt. Returns a route dict like get_route with the
+    visiting order and per-leg figures added.
+    """
+    names = [start_name] + [name for name in dict.fromkeys(stop_names) if name != start_name]
+    coords = [tuple(start_coords)] + [CAMPUS_LOCATIONS[name] for name in names[1:]]
+    n = len(names)
+    
+    legs = {}
+    cost = np.zeros((n, n))
+    for i in range(n):
+        for j in range(n):
+            if i != j:
+                leg = get_named_route(names[i], names[j]) or get_route(coords[i], coords[j])
+                legs[i, j] = leg
+                cost[i, j] = leg['distance']
+    
+    order = optimise_tour(cost, 0, return_to_start)
+    visits = order + [order[0]] if return_to_start and n > 1 else order
+    
+    route_points, steps, tour_legs = [coords[0]], [], []
+    for a, b in zip(visits, visits[1:]):
+        leg = legs[a, b]
+        # Legs meet at each stop; don't repeat the shared point
+        points = list(leg['route_points'])
+        route_points.extend(points[1:] if points and points[0] == route_points[-1] else points)
+        steps.extend(leg['steps'])
+        steps.append({'instruction': f"arrive at {names[b]}", 'distance': 0.0})
+        tour_legs.append({'from': names[a], 'to': names[b], 'distance': leg['distance'], 'duration': leg['duration']})
+    
+    return {
+        'order': [names[i] for i in visits],
+        'legs': tour_legs,
+        'route_points': route_points,
+        'distance': sum(leg['distance'] for leg in tour_legs),
+        'duration': sum(leg['duration'] for leg in tour_legs),
+        'steps': steps
+    }
+
+_base_map_lock = threading.Lock()
+_base_maps = {}
+
+def base_map_template(tile_server=None):
+    """Map with the tile layers and layer control every campus map shares, built once per tile server"""
+    with _base_map_lock:
+        if tile_server not in _base_maps:
+            _base_maps[tile_server] = build_base_map(tile_server)
+        return _base_maps[tile_server]
+
+def tile_url(layer, tile_server=None):
+    """Leaflet URL template for a tile layer, through the tile proxy when one is given"""
+    if tile_server:
+        return f"{tile_server.rstrip('/')}/{layer}/{{z}}/{{x}}/{{y}}"
+    return TILE_SOURCES[layer]
+
+def build_base_map(tile_server=None):
     m = folium.Map(
-        location=[center_lat, center_lng],
-        zoom_start=16,
+        location=[0, 0],
+        zoom_start=MAP_ZOOM,
         tiles=None
     )
     
     folium.TileLayer(
-        tiles='https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}',
+        tiles=tile_url('satellite', tile_server),
         attr='Google',
         name='Satellite',
         overlay=False,
@@ -392,7 +459,7 @@ def create_map(source_coords, destination_coords, source_name, dest_name):
     ).add_to(m)
     
     folium.TileLayer(
-        tiles='https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}',
+        tiles=tile_url('hybrid', tile_server),
         attr='Google',
         name='Satellite + Labels',
         overlay=False,
@@ -400,9 +467,51 @@ def create_map(source_coords, destination_coords, source_name, dest_name):
     ).add_to(m)
     
     folium.LayerControl().add_to(m)
+    return m
+
+def create_map(source_coords, destination_coords, source_name, dest_name, route_data=None, reachable=None,
+               waypoints=None, tile_server=TILE_SERVER_URL, tracking=False):
+    """Create folium map with real road route, optionally shading an isochrone or numbering tour stops.
+
+    Tiles come from the tile_proxy.py server at tile_server when one is set.
+    With tracking, the live location marker follows the browser's GPS
+    without rerunning the page.
+    """
+    
+    if route_data is None:
+        route_data = get_route(source_coords, destination_coords)
+    route_points = route_data['route_points']
     
+    center_lat = (source_coords[0] + destination_coords[0]) / 2
+    center_lng = (source_coords[1] + destination_coords[1]) / 2
+    
+    # Copying the template is much cheaper than building a folium.Map
+    m = copy.deepcopy(base_map_template(tile_server))
+    m.location = [center_lat, center_lng]
+    
+    if reachable and len(reachable['area']) >= 3:
+        folium.Polygon(
+            reachable['area'],
+            color='#667eea',
+            weight=1,
+            fill=True,
+            fillColor='#667eea',
+            fillOpacity=0.15,
+            tooltip=f"Reachable in {reachable['minutes']} min"
+        ).add_to(m)
+        for name, distance in reachable['locations']:
+            folium.CircleMarker(
+                CAMPUS_LOCATIONS[name],
+                radius=5,
+                color='#667eea',
+                fill=True,
+                fillOpacity=0.8,
+                tooltip=f"{name} ({distance / WALKING_SPEED / 60:.0f} min)"
+            ).add_to(m)
+    
+    shown_points = simplify_for_zoom(route_points, ROUTE_DETAIL_ZOOM)
     folium.PolyLine(
-        route_points,
+        shown_points,
         color='#FFD700',
         weight=8,
         opacity=0.9,
@@ -424,22 +533,26 @@ def create_map(source_coords, destination_coords, source_name, dest_name):
             ).add_to(m)
     
     if source_name == "📱 Your Location":
-        folium.Marker(
+        user_marker = folium.Marker(
             source_coords,
             popup=f"<b>{source_name}</b><br>{source_coords[0]:.6f}, {source_coords[1]:.6f}",
             tooltip="You are here!",
             icon=folium.Icon(color='blue', icon='user', prefix='fa')
         ).add_to(m)
         
+        halos = []
         for radius, opacity in [(10, 0.7), (20, 0.4), (30, 0.2)]:
-            folium.Circle(
+            halos.append(folium.Circle(
                 source_coords,
                 radius=radius,
                 color='#0066FF',
                 fill=True,
                 fillColor='#0066FF',
                 fillOpacity=opacity
-            ).add_to(m)
+            ).add_to(m))
+        
+        if tracking:
+            LiveTracker(user_marker, shown_points, halos).add_to(m)
     else:
         folium.Marker(
             source_coords,
@@ -473,8 +586,30 @@ def create_map(source_coords, destination_coords, source_name, dest_name):
         fillOpacity=0.7
     ).add_to(m)
     
+    for number, name in enumerate(waypoints or [], 1):
+        folium.Marker(
+            CAMPUS_LOCATIONS[name],
+            popup=f"<b>Stop {number}: {name}</b>",
+            tooltip=f"{number}. {name}",
+            icon=folium.Icon(color='orange', icon='map-marker', prefix='fa')
+        ).add_to(m)
+    
     return m, route_data
 
+def render_map_html(source_coords, destination_coords, source_name, dest_name, route_data, reachable=None,
+                    waypoints=None, tracking=False):
+    """HTML of the map for a route, from the map cache when it has been drawn before"""
+    key = (
+        tuple(source_coords), tuple(destination_coords), source_name, dest_name, route_fingerprint(route_data),
+        (reachable['minutes'], tuple(reachable['area'])) if reachable else None,
+        tuple(waypoints or ()), tracking
+    )
+    return get_map_cache().get_or_render(
+        key,
+        lambda: create_map(source_coords, destination_coords, source_name, dest_name, route_data, reachable,
+                           waypoints, tracking=tracking)[0]
+    )
+
 def show():
     """Main function called from home.py"""
     st.markdown("<h1 style='text-align: center;'>🎯 Campus Navigation System</h1>", unsafe_allow_html=True)
@@ -494,9 +629,18 @@ def show():
     with col_btn:
         if use_live and not st.session_state.location_acquired:
             if st.button("📍 Get Location", type="primary"):
-                st.markdown("---")
-                get_location_component()
-                st.stop()
+                # A fresh key, so the component never hands back an earlier fix
+                st.session_state.location_requests += 1
+                st.session_state.locating = True
+    
+    if use_live and st.session_state.locating and not st.session_state.location_acquired:
+        st.markdown("---")
+        fix = get_location_component(key=f"location_fix_{st.session_state.location_requests}")
+        if fix is None:
+            st.stop()
+        store_live_location((fix['latitude'], fix['longitude']), fix.get('accuracy'))
+        st.session_state.locating = False
+        st.rerun()
     
     if use_live and not st.session_state.user_location:
         st.info("👆 Click 'Get Location' to start live navigation")
@@ -504,16 +648,27 @@ def show():
     
     if use_live and st.session_state.user_location:
         lat, lng = st.session_state.user_location
+        accuracy = st.session_state.location_accuracy
+        accuracy_html = f"<p><strong>Accuracy:</strong> ±{accuracy:.0f}m</p>" if accuracy is not None else ""
         st.markdown(f"""
         <div class="location-card">
             <h3>✅ Live Location Active</h3>
             <p><strong>Coordinates:</strong> {lat:.6f}, {lng:.6f}</p>
+            {accuracy_html}
         </div>
         """, unsafe_allow_html=True)
         
+        tracking = st.checkbox(
+            "📡 Follow me on the map",
+            key="live_tracking",
+            help="Moves your marker and the distance left as you walk, without reloading the page or rerouting"
+        )
+        
         if st.button("🔄 Update Location"):
             st.session_state.location_acquired = False
             st.rerun()
+    else:
+        tracking = False
     
     st.markdown("---")
     
@@ -525,25 +680,53 @@ def show():
             source_name = "📱 Your Location"
             source_coords = st.session_state.user_location
             st.info(f"Using live GPS location\n\n{source_coords[0]:.6f}, {source_coords[1]:.6f}")
+            # Route from the snapped place so small GPS jitter reuses the same route
+            snapped_name, route_coords, offset = snap_location(source_coords, st.session_state.location_accuracy)
+            route_name = snapped_name or source_name
+            if snapped_name:
+                st.caption(f"At {snapped_name} ({offset:.0f}m away)")
+            closest = locations_by_distance(source_coords, limit=3)
+            st.caption("Closest: " + ", ".join(
+                f"{name} ({distance:.0f}m {get_direction(bearing)})" for name, distance, bearing in closest
+            ))
         else:
             source_name = st.selectbox(
                 "Select starting point",
-                options=list(CAMPUS_LOCATIONS.keys()),
-                index=list(CAMPUS_LOCATIONS.keys()).index("Hut Cafe")
+                options=LOCATION_NAMES,
+                index=LOCATION_POSITIONS.get("Hut Cafe", 0)
             )
             source_coords = CAMPUS_LOCATIONS[source_name]
+            route_name, route_coords = source_name, source_coords
     
     with col2:
         st.markdown("### 🎯 To")
+        query = st.text_input("🔎 Search places", key="dest_search", placeholder="e.g. SM Lab, library, ccd")
+        default_dest = st.session_state.get('quick_dest', "Library Block")
+        if query:
+            matches = search_locations(query)
+            if matches:
+                default_dest = matches[0]
+                st.caption("Matches: " + ", ".join(matches))
+            else:
+                st.caption(f"No places match \"{query}\"")
         dest_name = st.selectbox(
             "Select destination",
-            options=list(CAMPUS_LOCATIONS.keys()),
-            index=list(CAMPUS_LOCATIONS.keys()).index("Library Block")
+            options=LOCATION_NAMES,
+            index=LOCATION_POSITIONS.get(default_dest, 0)
         )
         dest_coords = CAMPUS_LOCATIONS[dest_name]
     
+    popular_locations = [
+        name for name in ["Library Block", "Hut Cafe", "REC Cafe", "Indoor Auditorium", "A Block", "Tech Lounge"]
+        if name in CAMPUS_LOCATIONS
+    ]
+    prefetch_quick_routes(route_name, route_coords, popular_locations)
+    
+    # Trips between named locations come from the precomputed matrix; other GPS trips are routed live
+    route_data = get_named_route(route_name, dest_name)
     with st.spinner("🗺️ Calculating best route..."):
-        campus_map, route_data = create_map(source_coords, dest_coords, source_name, dest_name)
+        if route_data is None:
+            route_data = get_route(route_coords, dest_coords)
     
     distance = route_data['distance']
     walking_time = int(route_data['duration'] / 60)
@@ -594,6 +777,9 @@ def show():
     st.markdown("---")
     st.markdown("### 🚶 Walking Directions")
     
+    if route_data.get('fallback'):
+        st.caption("Routing service is slow or unavailable; showing a straight-line estimate until the walking route loads.")
+    
     if route_data.get('steps') and len(route_data['steps']) > 0:
         st.success("📍 Turn-by-turn navigation:")
         for idx, step in enumerate(route_data['steps'][:5], 1):
@@ -609,23 +795,70 @@ def show():
     elif distance < 100:
         st.success("✅ You're nearby! Just a short walk away.")
     
+    st.markdown("---")
+    st.markdown("### ⏱️ Reachable on Foot")
+    col_minutes, col_shade = st.columns([3, 1])
+    with col_minutes:
+        minutes = st.slider("Minutes of walking", min_value=1, max_value=15, value=5, key="isochrone_minutes")
+    with col_shade:
+        shade = st.checkbox("Shade on map", key="show_isochrone")
+    
+    reachable = isochrone(route_name, route_coords, minutes)
+    if reachable['locations']:
+        st.caption(f"Within {minutes} min ({reachable['distance']:.0f}m): " + ", ".join(
+            f"{name} ({distance / WALKING_SPEED / 60:.0f} min)" for name, distance in reachable['locations']
+        ))
+    else:
+        st.caption(f"No campus locations within {minutes} min of walking")
+    
     st.markdown("---")
     st.markdown("### 🗺️ Live Navigation Map")
     st.caption("The yellow line shows the walking route following actual roads and pathways")
     
-    st_folium(campus_map, width=700, height=500, returned_objects=[])
+    if tracking:
+        left, off = remaining_distance(route_data['route_points'], source_coords)
+        st.caption(
+            f"Following your GPS on the map: {left:.0f}m of the route left from your last fix ({off:.0f}m off it). "
+            "Press Update Location to reroute from where you are."
+        )
+    
+    map_html = render_map_html(source_coords, dest_coords, source_name, dest_name, route_data,
+                               reachable if shade else None, tracking=tracking)
+    # Identical HTML on reruns lets the browser keep the map it already has
+    components.html(map_html, width=700, height=500)
+    
+    st.markdown("---")
+    st.markdown("### 🧭 Plan a Walking Tour")
+    tour_stops = st.multiselect(
+        "Places to visit",
+        options=[name for name in LOCATION_NAMES if name != route_name],
+        key="tour_stops"
+    )
+    return_to_start = st.checkbox("Return to the starting point", key="tour_return")
+    
+    if tour_stops:
+        tour = plan_tour(route_name, route_coords, tour_stops, return_to_start)
+        st.success(
+            f"**Best order:** {' → '.join(tour['order'])} — "
+            f"{tour['distance']:.0f}m, about {tour['duration'] / 60:.0f} min"
+        )
+        for idx, leg in enumerate(tour['legs'], 1):
+            st.caption(f"{idx}. {leg['from']} → {leg['to']}: {leg['distance']:.0f}m ({leg['duration'] / 60:.0f} min)")
+        
+        last_name = tour['order'][-1]
+        last_coords = route_coords if last_name == route_name else CAMPUS_LOCATIONS[last_name]
+        stops_on_map = [name for name in tour['order'][1:] if name != last_name]
+        tour_html = render_map_html(source_coords, last_coords, source_name, last_name, tour, waypoints=stops_on_map)
+        components.html(tour_html, width=700, height=500)
     
     st.markdown("---")
     st.markdown("### ⚡ Quick Access")
     
-    popular_locations = ["Library Block", "Hut Cafe", "REC Cafe", "Indoor Auditorium", "A Block", "Tech Lounge"]
     cols = st.columns(3)
     
     for idx, loc in enumerate(popular_locations):
         with cols[idx % 3]:
-            if st.button(f"📍 {loc}", use_container_width=True):
-                st.session_state.quick_dest = loc
-                st.rerun()
+            st.button(f"📍 {loc}", use_container_width=True, on_click=choose_quick_dest, args=(loc,))
     
     with st.expander("ℹ️ How to Use"):
         st.markdown("""
@@ -654,6 +887,7 @@ def show():
         - 📡 Move to an open area for better GPS accuracy
         - 🔋 Enable high accuracy mode in location settings
         - 🏢 Indoor GPS may be less accurate
+        - 📡 Tick "Follow me on the map" to keep your marker moving as you walk
         - 🔄 Click "Update Location" to refresh your position
         
         **Troubleshooting:**
@@ -0,0 +1,146 @@
+import bisect
+import json
+import os
+import re
+import threading
+
+REGISTRY_FILE = "campus_locations.json"
+
+# Fuzzy matches need at least this share of trigrams in common (Dice coefficient)
+FUZZY_THRESHOLD = 0.35
+
+# Words that name the kind of place rather than the place, kept whole in
+# generated aliases ("Solid Mechanics Lab" -> "SM Lab")
+KIND_WORDS = {"lab", "block", "gate", "court", "cafe", "hostel", "office", "parking", "hall", "room"}
+
+def normalize_name(text):
+    """Lower-case a place name or query and reduce it to single-spaced words"""
+    return " ".join(re.findall(r"[0-9a-z]+", str(text).casefold()))
+
+def generated_aliases(name):
+    """Abbreviations people use for multi-word names: "SML" and "SM Lab" for "Solid Mechanics Lab" """
+    words = name.split()
+    if len(words) < 3:
+        return []
+    aliases = ["".join(word[0] for word in words).upper()]
+    if words[-1].casefold() in KIND_WORDS:
+        aliases.append("".join(word[0] for word in words[:-1]).upper() + " " + words[-1])
+    return aliases
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class PlaceRegistry:
+    """Named campus places with aliases and a type-ahead search index.
+
+    Prefix lookups bisect a sorted list of every name, alias and word
+    suffix ("mechanics lab" for "Solid Mechanics Lab"); fuzzy lookups score
+    candidates through a trigram inverted index. Neither scans every place.
+    """
+
+    def __init__(self, places):
+        self.places = places
+        self.locations = {place['name']: (place['lat'], place['lon']) for place in places}
+        self.names = list(self.locations)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+        # Exact lookups: normalized name or alias -> place names
+        self._exact = {}
+        terms = []
+        for place in places:
+            name = place['name']
+            for alias in [name] + place.get('aliases', []) + generated_aliases(name):
+                key = normalize_name(alias)
+                if key and name not in self._exact.setdefault(key, []):
+                    self._exact[key].append(name)
+                    terms.append((key, name))
+
+        # Prefix index: (key, word position, name) sorted by key
+        prefix = []
+        for key, name in terms:
+            words = key.split()
+            for i in range(len(words)):
+                prefix.append((" ".join(words[i:]), i, name))
+        prefix.sort()
+        self._prefix_keys = [entry[0] for entry in prefix]
+        self._prefix = prefix
+
+        # Trigram index over whole names and aliases
+        self._terms = terms
+        self._term_grams = [len(trigrams(key)) for key, _ in terms]
+        self._grams = {}
+        for term_id, (key, _) in enumerate(terms):
+            for gram in trigrams(key):
+                self._grams.setdefault(gram, []).append(term_id)
+
+    @classmethod
+    def load(cls, path=REGISTRY_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # A repeated name replaces the earlier entry
+        places = {}
+        for place in data["places"]:
+            places[place["name"]] = dict(place, lat=float(place["lat"]), lon=float(place["lon"]))
+        return cls(list(places.values()))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.locations
+
+    def resolve(self, query):
+        """The place a query most likely means, or None"""
+        matches = self.search(query, limit=1)
+        return matches[0] if matches else None
+
+    def search(self, query, limit=10):
+        """Place names matching query: exact names and aliases, then prefixes.
+
+        Fuzzy matches are only tried when nothing matches exactly or by prefix.
+        """
+        key = normalize_name(query)
+        if not key:
+            return []
+
+        results = list(self._exact.get(key, []))
+        if len(results) < limit:
+            results.extend(name for name in self._prefix_matches(key) if name not in results)
+        if not results:
+            results = self._fuzzy_matches(key)
+        return results[:limit]
+
+    def _prefix_matches(self, key):
+        start = bisect.bisect_left(self._prefix_keys, key)
+        end = bisect.bisect_left(self._prefix_keys, key + "\uffff", start)
+        # Matches at the start of a name first, then shorter names
+        entries = sorted(self._prefix[start:end], key=lambda entry: (entry[1], len(entry[2]), entry[2]))
+        return list(dict.fromkeys(entry[2] for entry in entries))
+
+    def _fuzzy_matches(self, key):
+        grams = trigrams(key)
+        shared = {}
+        for gram in grams:
+            for term_id in self._grams.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+
+        scores = {}
+        for term_id, count in shared.items():
+            score = 2 * count / (len(grams) + self._term_grams[term_id])
+            name = self._terms[term_id][1]
+            if score >= FUZZY_THRESHOLD and score > scores.get(name, 0):
+                scores[name] = score
+        return sorted(scores, key=lambda name: (-scores[name], name))
+
+_registry_lock = threading.Lock()
+_registries = {}
+
+def load_registry(path=REGISTRY_FILE):
+    """Return the place registry shared by every session; raises FileNotFoundError if path is missing"""
+    with _registry_lock:
+        if path not in _registries:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Campus location registry {path!r} not found")
+            _registries[path] = PlaceRegistry.load(path)
+        return _registries[path]
@@ -0,0 +1,155 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = "peer_resource_exchange.db"
+
+# Idle connections kept open per database; more are opened under load and
+# closed again when the pool is full
+POOL_SIZE = 8
+
+# How long a writer waits for another writer before "database is locked"
+BUSY_TIMEOUT_SECONDS = 5
+
+# Prepared statements each connection keeps, looked up by SQL text
+STATEMENT_CACHE_SIZE = 128
+
+# WAL lets readers carry on while a session writes. With WAL, synchronous
+# NORMAL can lose the last commits on power loss but never corrupts the file.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+TABLES = ("""
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE,
+    password TEXT
+)
+""", """
+CREATE TABLE IF NOT EXISTS rental_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT,
+    name TEXT,
+    description TEXT,
+    price REAL,
+    image_path TEXT,
+    contact TEXT,
+    rented_by TEXT DEFAULT NULL,
+    borrow_date TEXT DEFAULT NULL,
+    return_date TEXT DEFAULT NULL,
+    approved TEXT DEFAULT 'pending',
+    listing_type TEXT DEFAULT 'item'
+)
+""")
+
+INDEXES = ("""
+CREATE INDEX IF NOT EXISTS rental_items_type ON rental_items (listing_type)
+""",)
+
+class ConnectionPool:
+    """Open connections to one SQLite database, shared by every session.
+
+    Streamlit runs each rerun on a new thread, so connections are lent to
+    one thread at a time instead of being tied to a thread. Idle
+    connections, and the prepared statements they cache, carry over from
+    one run to the next.
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=size)
+        with self.transaction() as conn:
+            create_tables(conn)
+
+    def _open(self):
+        # isolation_level=None leaves transactions to transaction()
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """A connection for this thread to use until the block ends"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """A connection inside a write transaction, committed when the block ends and rolled back on error.
+
+        BEGIN IMMEDIATE takes the write lock up front. Two sessions that
+        both read and then try to write would otherwise deadlock, and one
+        gets "database is locked" without waiting out the busy timeout.
+        """
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        """All rows of a read; it never waits for writers"""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def execute(self, sql, params=()):
+        """Run one write in its own transaction; returns the number of rows changed"""
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+def create_tables(conn):
+    """Create the exchange tables, adding listing_type to databases made before it existed"""
+    for statement in TABLES:
+        conn.execute(statement)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(rental_items)")]
+    if "listing_type" not in columns:
+        conn.execute("ALTER TABLE rental_items ADD COLUMN listing_type TEXT DEFAULT 'item'")
+    for statement in INDEXES:
+        conn.execute(statement)
+
+_default_lock = threading.Lock()
+_pools = {}
+
+def get_db(path=DB_PATH):
+    """Return the connection pool for path shared by every session, creating its tables on first use"""
+    with _default_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
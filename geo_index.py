@@ -0,0 +1,190 @@
+import heapq
+import math
+
+import numpy as np
+
+# Mean Earth radius used for every distance on the sphere
+EARTH_RADIUS_KM = 6371.0088
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+
+# Walking pace in metres per second, shared by campus navigation and bus transfers
+WALKING_SPEED = 1.4
+
+# Maximum number of points stored in a leaf of the tree
+LEAF_SIZE = 16
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments may be scalars or broadcastable arrays"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def to_unit_vectors(lats, lons):
+    """Convert latitude/longitude arrays to 3D unit vectors on the sphere"""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def chord_to_km(chord):
+    """Convert a straight-line chord between unit vectors to great-circle km"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+def km_to_chord(km):
+    """Convert a great-circle distance in km to a chord between unit vectors"""
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+class GeoIndex:
+    """KD-tree over latitude/longitude points.
+
+    Points are stored as unit vectors so that distances never need to deal
+    with longitude wrap-around, and the tree is kept in flat arrays so it can
+    be saved and mapped back from disk. Answers k-nearest and radius queries
+    in roughly logarithmic time; distances are returned in km.
+    """
+
+    def __init__(self, lats, lons, leaf_size=LEAF_SIZE):
+        points = to_unit_vectors(lats, lons)
+        order = np.arange(len(points), dtype=np.int64)
+        nodes = self._build(points, order, leaf_size)
+
+        self.points = points
+        self.order = order
+        self.nodes = nodes
+        self._load_nodes()
+
+    @classmethod
+    def from_arrays(cls, points, order, nodes):
+        """Rebuild an index from arrays produced by a previous build"""
+        index = cls.__new__(cls)
+        index.points = points
+        index.order = order
+        index.nodes = nodes
+        index._load_nodes()
+        return index
+
+    def __len__(self):
+        return len(self.points)
+
+    @staticmethod
+    def _build(points, order, leaf_size):
+        # Each node row: start, end, split dimension, left child, right child.
+        # Leaves use -1 as split dimension; split values live in a second array.
+        rows, splits = [], []
+        stack = [(0, len(points), -1, 0)]
+
+        while stack:
+            start, end, parent, side = stack.pop()
+            node_id = len(rows)
+            rows.append([start, end, -1, -1, -1])
+            splits.append(0.0)
+            if parent >= 0:
+                rows[parent][3 + side] = node_id
+
+            if end - start <= leaf_size:
+                continue
+
+            block = points[start:end]
+            dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (start + end) // 2
+            part = np.argpartition(block[:, dim], mid - start)
+            points[start:end] = block[part]
+            order[start:end] = order[start:end][part]
+
+            rows[node_id][2] = dim
+            splits[node_id] = float(points[mid, dim])
+            stack.append((mid, end, node_id, 1))
+            stack.append((start, mid, node_id, 0))
+
+        return {
+            'rows': np.asarray(rows, dtype=np.int64).reshape(-1, 5),
+            'splits': np.asarray(splits, dtype=float),
+        }
+
+    def _load_nodes(self):
+        # Plain lists are much faster than NumPy scalars for tree traversal
+        rows = np.asarray(self.nodes['rows'])
+        self._start = rows[:, 0].tolist()
+        self._end = rows[:, 1].tolist()
+        self._dim = rows[:, 2].tolist()
+        self._left = rows[:, 3].tolist()
+        self._right = rows[:, 4].tolist()
+        self._split = np.asarray(self.nodes['splits']).tolist()
+
+    def _children(self, node, q):
+        diff = q[self._dim[node]] - self._split[node]
+        if diff < 0:
+            return self._left[node], self._right[node], diff * diff
+        return self._right[node], self._left[node], diff * diff
+
+    def nearest(self, lat, lon, k=1):
+        """Return (indices, distances_km) of the k points closest to lat/lon"""
+        k = min(k, len(self.points))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        q = to_unit_vectors([lat], [lon])[0]
+        q_list = q.tolist()
+        heap = []  # max-heap of (-squared chord, position)
+        worst = math.inf
+        stack = [(0, 0.0)]
+
+        while stack:
+            node, bound = stack.pop()
+            if bound >= worst:
+                continue
+
+            if self._dim[node] < 0:
+                start, end = self._start[node], self._end[node]
+                d2 = ((self.points[start:end] - q) ** 2).sum(axis=1)
+                for offset in np.flatnonzero(d2 < worst).tolist():
+                    item = (-float(d2[offset]), start + offset)
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    else:
+                        heapq.heappushpop(heap, item)
+                    if len(heap) == k:
+                        worst = -heap[0][0]
+                continue
+
+            near, far, diff2 = self._children(node, q_list)
+            stack.append((far, max(bound, diff2)))
+            stack.append((near, bound))
+
+        heap.sort(reverse=True)
+        positions = np.array([pos for _, pos in heap], dtype=np.int64)
+        chords = np.sqrt([-d2 for d2, _ in heap])
+        return self.order[positions], chord_to_km(chords)
+
+    def within(self, lat, lon, radius_km):
+        """Return (indices, distances_km) of all points within radius_km, nearest first"""
+        q = to_unit_vectors([lat], [lon])[0]
+        q_list = q.tolist()
+        limit = km_to_chord(radius_km) ** 2
+        positions, d2s = [], []
+        stack = [(0, 0.0)]
+
+        while stack:
+            node, bound = stack.pop()
+            if bound > limit:
+                continue
+
+            if self._dim[node] < 0:
+                start, end = self._start[node], self._end[node]
+                d2 = ((self.points[start:end] - q) ** 2).sum(axis=1)
+                hits = np.flatnonzero(d2 <= limit)
+                positions.append(hits + start)
+                d2s.append(d2[hits])
+                continue
+
+            near, far, diff2 = self._children(node, q_list)
+            stack.append((far, max(bound, diff2)))
+            stack.append((near, bound))
+
+        if not positions:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        positions = np.concatenate(positions)
+        d2s = np.concatenate(d2s)
+        ranked = np.argsort(d2s, kind='stable')
+        return self.order[positions[ranked]], chord_to_km(np.sqrt(d2s[ranked]))
@@ -13,7 +13,6 @@ import os
 import sys
 import importlib
 import pandas as pd
-import sqlite3
 from datetime import datetime
 import json
 
@@ -21,6 +20,7 @@ import bus_stop_finder
 import campus_navigation
 import peer_resource_exchange
 import timetable_scheduler
+from exchange_db import get_db
 
 # Your remaining code below...
 if not os.path.exists("uploads"):
@@ -43,41 +43,8 @@ if "selected_date" not in st.session_state:
     st.session_state["selected_date"] = None
 
 
-def create_tables():
-    conn = sqlite3.connect("peer_resource_exchange.db")
-    c = conn.cursor()
-    
-    # Users table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            password TEXT
-        )
-    """)
-
-    # Rental items table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS rental_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            owner TEXT,
-            name TEXT,
-            description TEXT,
-            price REAL,
-            image_path TEXT,
-            contact TEXT,
-            rented_by TEXT DEFAULT NULL,
-            borrow_date TEXT DEFAULT NULL,
-            return_date TEXT DEFAULT NULL,
-            approved TEXT DEFAULT 'pending'
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
-
-# Create database tables
-create_tables()
+# Create database tables once per process; the pool is shared by every session
+db = get_db()
 
 # Function to save schedule data
 def save_data(data):
@@ -114,11 +81,7 @@ if app_choice == "Home":
     
     with col3:
         # Count items in the exchange
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM rental_items")
-        item_count = c.fetchone()[0]
-        conn.close()
+        item_count = db.query_one("SELECT COUNT(*) FROM rental_items")[0]
         
         st.metric(label="Items for Exchange", value=str(item_count))
     
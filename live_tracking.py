@@ -0,0 +1,163 @@
+from branca.element import MacroElement, Template
+
+from geo_index import EARTH_RADIUS_M, WALKING_SPEED
+from route_polyline import route_progress
+
+# At most one GPS fix per interval reaches the map; the newest one wins
+TRACK_INTERVAL_MS = 2000
+
+# Fixes closer than this to the last one shown are GPS jitter. A fix also
+# has to move by half its own accuracy before the marker follows it.
+MIN_DISPLACEMENT_M = 5
+
+# Beyond this distance from the route the walker is told to reroute
+OFF_ROUTE_M = 40
+
+# Closer than this to the end of the route counts as arrived
+ARRIVAL_M = 15
+
+class LiveTracker(MacroElement):
+    """Follows the browser's watchPosition fixes on a rendered map.
+
+    Each accepted fix moves the user marker (and its halo circles) and
+    recomputes the distance left along the route shown on the map, all in
+    the browser. Streamlit never reruns, so continuous tracking costs no
+    routing or map rendering; routing from a new start still goes through
+    "Update Location". route_polyline.remaining_distance is the same
+    calculation in Python.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var marker = {{ this.marker.get_name() }};
+            var halos = [{% for halo in this.halos %}{{ halo.get_name() }}{% if not loop.last %}, {% endif %}{% endfor %}];
+            var route = {{ this.route | tojson }};
+            var progress = {{ this.progress | tojson }};
+            var R = {{ this.earth_radius }};
+            var rad = Math.PI / 180;
+            var cosLat = Math.cos(route[0][0] * rad);
+
+            function toXY(p) { return [p[1] * rad * cosLat * R, p[0] * rad * R]; }
+            var xy = route.map(toXY);
+
+            // Metres left along the route and metres off it, as in route_polyline.remaining_distance
+            function locate(p) {
+                var q = toXY(p);
+                if (xy.length === 1) {
+                    return [0, Math.hypot(q[0] - xy[0][0], q[1] - xy[0][1])];
+                }
+                var best = Infinity, walked = 0;
+                for (var i = 0; i < xy.length - 1; i++) {
+                    var ax = xy[i][0], ay = xy[i][1];
+                    var bx = xy[i + 1][0] - ax, by = xy[i + 1][1] - ay;
+                    var len2 = bx * bx + by * by;
+                    var t = len2 > 0 ? ((q[0] - ax) * bx + (q[1] - ay) * by) / len2 : 0;
+                    t = Math.max(0, Math.min(1, t));
+                    var d = Math.hypot(ax + t * bx - q[0], ay + t * by - q[1]);
+                    if (d < best) {
+                        best = d;
+                        walked = progress[i] + t * (progress[i + 1] - progress[i]);
+                    }
+                }
+                return [progress[progress.length - 1] - walked, best];
+            }
+
+            var panel = L.control({position: 'topright'});
+            panel.onAdd = function() {
+                var div = L.DomUtil.create('div');
+                div.style.cssText = 'background: white; padding: 6px 10px; border-radius: 8px; '
+                    + 'font: 14px sans-serif; box-shadow: 0 1px 5px rgba(0, 0, 0, 0.4);';
+                div.textContent = '📡 Waiting for GPS…';
+                return div;
+            };
+            panel.addTo(map);
+
+            function show(fix) {
+                var latlng = [fix.lat, fix.lng];
+                marker.setLatLng(latlng);
+                halos.forEach(function(halo) { halo.setLatLng(latlng); });
+                if (!map.getBounds().contains(latlng)) {
+                    map.panTo(latlng);
+                }
+
+                var located = locate(latlng);
+                var left = located[0], off = located[1];
+                var text;
+                if (off > {{ this.off_route_m }}) {
+                    text = '⚠️ ' + Math.round(off) + 'm off the route; press Update Location to reroute';
+                } else if (left < {{ this.arrival_m }}) {
+                    text = '🎯 You have arrived';
+                } else {
+                    text = '🚶 ' + Math.round(left) + 'm left · '
+                        + Math.max(1, Math.round(left / {{ this.walking_speed }} / 60)) + ' min';
+                }
+                panel.getContainer().textContent = text + ' (±' + Math.round(fix.acc) + 'm)';
+            }
+
+            function moved(a, b) {
+                var dx = (b.lng - a.lng) * rad * Math.cos(a.lat * rad) * R;
+                var dy = (b.lat - a.lat) * rad * R;
+                return Math.hypot(dx, dy);
+            }
+
+            // Throttle to one fix per interval, keeping the newest, and drop jitter
+            var shown = null, pending = null, timer = null;
+            function onFix(position) {
+                var fix = {
+                    lat: position.coords.latitude,
+                    lng: position.coords.longitude,
+                    acc: position.coords.accuracy
+                };
+                if (shown && moved(shown, fix) < Math.max({{ this.min_move_m }}, fix.acc / 2)) {
+                    return;
+                }
+                pending = fix;
+                if (timer !== null) {
+                    return;
+                }
+                var wait = shown ? Math.max(0, shown.time + {{ this.interval_ms }} - Date.now()) : 0;
+                timer = setTimeout(function() {
+                    timer = null;
+                    pending.time = Date.now();
+                    shown = pending;
+                    pending = null;
+                    show(shown);
+                }, wait);
+            }
+
+            function onError(error) {
+                panel.getContainer().textContent = '📡 GPS unavailable: ' + error.message;
+            }
+
+            if (!navigator.geolocation) {
+                onError({message: 'not supported by this browser'});
+                return;
+            }
+            var watch = navigator.geolocation.watchPosition(onFix, onError, {
+                enableHighAccuracy: true,
+                maximumAge: {{ this.interval_ms }},
+                timeout: 20000
+            });
+            window.addEventListener('pagehide', function() {
+                navigator.geolocation.clearWatch(watch);
+            });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, marker, route_points, halos=(), interval_ms=TRACK_INTERVAL_MS,
+                 min_move_m=MIN_DISPLACEMENT_M):
+        super().__init__()
+        self._name = "LiveTracker"
+        self.marker = marker
+        self.halos = list(halos)
+        self.route = [[round(lat, 6), round(lon, 6)] for lat, lon in route_points]
+        self.progress = [round(distance, 2) for distance in route_progress(self.route)]
+        self.earth_radius = EARTH_RADIUS_M
+        self.interval_ms = int(interval_ms)
+        self.min_move_m = min_move_m
+        self.off_route_m = OFF_ROUTE_M
+        self.arrival_m = ARRIVAL_M
+        self.walking_speed = WALKING_SPEED
@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+
+from caching import shared_instance
+
+# Rendered maps kept in memory; each is 10-20 KB of HTML
+MAP_CACHE_SIZE = 128
+
+def route_fingerprint(route_data):
+    """Hashable summary of everything a route contributes to the map"""
+    return (tuple(tuple(point) for point in route_data['route_points']), round(route_data['distance']))
+
+class MapCache:
+    """LRU of rendered map HTML keyed on the route and markers drawn on it"""
+
+    def __init__(self, size=MAP_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._html = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, build):
+        """Return the HTML for key, rendering the folium map ``build()`` returns on a miss"""
+        with self._lock:
+            html = self._html.get(key)
+            if html is not None:
+                self._html.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        # Each miss renders its own map object, so nothing shared is mutated
+        html = build().get_root().render()
+        with self._lock:
+            self._html[key] = html
+            self._html.move_to_end(key)
+            while len(self._html) > self.size:
+                self._html.popitem(last=False)
+        return html
+
+@shared_instance
+def get_map_cache():
+    """Return the map cache shared by every session in this process"""
+    return MapCache()
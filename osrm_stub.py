@@ -0,0 +1,160 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from geo_index import WALKING_SPEED
+from walking_graph import haversine_m, load_walking_graph
+
+# Failure modes the stub can reproduce
+MODES = ("ok", "slow", "error", "hang", "noroute", "flaky")
+
+# Response delay in seconds for "slow", and how long "hang" holds a request
+DEFAULT_DELAY = 2.0
+HANG_SECONDS = 60
+
+def osrm_response(start, end):
+    """OSRM /route JSON between two (lat, lon) points.
+
+    Uses the campus walking graph when both points are on it and a straight
+    line otherwise.
+    """
+    graph = load_walking_graph()
+    route = graph.route(start, end) if graph is not None else None
+    if route is None:
+        distance = haversine_m(*start, *end)
+        route = {'route_points': [start, end], 'distance': distance, 'duration': distance / WALKING_SPEED, 'steps': []}
+
+    steps = [
+        {'distance': step['distance'], 'maneuver': {'type': 'depart'}} if step['instruction'] == 'depart' else
+        {'distance': step['distance'], 'maneuver': {'type': 'turn', 'modifier': step['instruction'][len('turn '):]}}
+        for step in route['steps']
+    ]
+    steps.append({'distance': 0, 'maneuver': {'type': 'arrive'}})
+    return {
+        'code': 'Ok',
+        'routes': [{
+            'distance': route['distance'],
+            'duration': route['duration'],
+            'geometry': {'type': 'LineString', 'coordinates': [[lon, lat] for lat, lon in route['route_points']]},
+            'legs': [{'steps': steps}],
+        }],
+    }
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers /route/v1/<profile>/<lon>,<lat>;<lon>,<lat> in the server's mode"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        mode = server.mode
+        if mode == "flaky":
+            mode = "error" if server.requests % 2 else "ok"
+
+        if mode == "slow":
+            time.sleep(server.delay)
+        elif mode == "hang":
+            time.sleep(HANG_SECONDS)
+        elif mode == "error":
+            return self._reply(503, {'code': 'ServiceUnavailable'})
+        elif mode == "noroute":
+            return self._reply(400, {'code': 'NoRoute', 'message': 'Impossible route between points'})
+
+        try:
+            parts = urlsplit(self.path).path.split("/")
+            points = [tuple(map(float, p.split(",")))[::-1] for p in parts[4].split(";")]
+        except (IndexError, ValueError):
+            return self._reply(400, {'code': 'InvalidUrl'})
+        self._reply(200, osrm_response(points[0], points[1]))
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except OSError:
+            # The client gave up waiting
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub(mode="ok", port=0, delay=DEFAULT_DELAY):
+    """Serve the stub from a daemon thread; returns the server and its base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.mode = mode
+    server.delay = delay
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def benchmark(modes, n_queries, delay=DEFAULT_DELAY):
+    """Render latency of the navigation page's routing call against each stub mode"""
+    # Imported here: the navigation page sets up Streamlit state on import
+    import campus_navigation
+    from routing_client import RoutingClient
+
+    names = list(campus_navigation.CAMPUS_LOCATIONS)
+    rng = np.random.default_rng(0)
+    results = []
+    for mode in modes:
+        server, url = start_stub(mode, delay=delay)
+        campus_navigation.OSRM_URL = url
+        # A plain dict stands in for the route cache so runs don't share routes
+        routes = {}
+        client = RoutingClient(campus_navigation.fetch_osrm_route, on_result=routes.__setitem__)
+
+        latencies, fallbacks = [], 0
+        for _ in range(n_queries):
+            i, j = rng.choice(len(names), 2, replace=False)
+            start, end = campus_navigation.CAMPUS_LOCATIONS[names[i]], campus_navigation.CAMPUS_LOCATIONS[names[j]]
+            key = campus_navigation.route_key(start, end, 'foot')
+            t0 = time.perf_counter()
+            if key not in routes and client.route(start, end) is None:
+                fallbacks += 1
+            latencies.append(time.perf_counter() - t0)
+
+        server.shutdown()
+        latencies = np.array(latencies) * 1000
+        results.append({
+            'mode': mode,
+            'queries': n_queries,
+            'backend_requests': server.requests,
+            'fallbacks': fallbacks,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max()),
+            'status': client.status(),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OSRM route service")
+    parser.add_argument("--mode", choices=MODES, default="ok")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--delay", type=float, default=DEFAULT_DELAY, help="seconds added in slow mode")
+    parser.add_argument("--benchmark", action="store_true", help="measure the routing client against every mode")
+    parser.add_argument("--queries", type=int, default=50, help="routing calls per mode when benchmarking")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(MODES, args.queries, args.delay), indent=2))
+        return
+
+    server, url = start_stub(args.mode, args.port, args.delay)
+    print(f"Stub OSRM ({args.mode}) on {url}; set CAMPUS_OSRM_URL={url} and CAMPUS_ROUTING_BACKEND=osrm")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import sqlite3
 import hashlib
 from datetime import datetime
 
+from exchange_db import get_db
+
 def show():
     st.title("📌 Peer Exchange Platform")
     
@@ -16,87 +18,55 @@ def show():
     peer_menu = ["Home", "Login", "Register", "Add Listing", "Skill Tutoring", "Student Services", "Users & Rentals"]
     peer_choice = st.sidebar.radio("Peer Exchange Navigation", peer_menu)
     
+    # Pooled connections shared by every session
+    db = get_db()
+    
     # Hash passwords for security
     def hash_password(password):
         return hashlib.sha256(password.encode()).hexdigest()
 
     # Register a new user
     def register_user(username, password):
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
         hashed_password = hash_password(password)
         try:
-            c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password))
-            conn.commit()
+            db.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password))
             return True
         except sqlite3.IntegrityError:
             return False
-        finally:
-            conn.close()
 
     # Authenticate user login
     def authenticate_user(username, password):
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
         hashed_password = hash_password(password)
-        c.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, hashed_password))
-        user = c.fetchone()
-        conn.close()
-        return user
+        return db.query_one("SELECT * FROM users WHERE username = ? AND password = ?", (username, hashed_password))
 
     # Add a listing (can be item, skill, or service)
     def add_listing(owner, name, description, price, image_path, contact, listing_type):
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
-        c.execute("""
+        db.execute("""
             INSERT INTO rental_items (owner, name, description, price, image_path, contact, listing_type)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (owner, name, description, price, image_path, contact, listing_type))
-        conn.commit()
-        conn.close()
 
     # Fetch all listings of a specific type
     def get_items_by_type(listing_type=None):
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
-        
         if listing_type:
-            c.execute("SELECT * FROM rental_items WHERE listing_type = ?", (listing_type,))
-        else:
-            c.execute("SELECT * FROM rental_items")
-            
-        items = c.fetchall()
-        conn.close()
-        return items
+            return db.query("SELECT * FROM rental_items WHERE listing_type = ?", (listing_type,))
+        return db.query("SELECT * FROM rental_items")
 
     # Request rental/service approval
     def request_rental(item_id, rented_by, borrow_date, return_date):
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
-        c.execute("""
+        db.execute("""
             UPDATE rental_items 
             SET rented_by = ?, borrow_date = ?, return_date = ?, approved = 'pending'
             WHERE id = ?
         """, (rented_by, borrow_date, return_date, item_id))
-        conn.commit()
-        conn.close()
 
     # Approve rental/service requests
     def approve_rental(item_id):
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
-        c.execute("UPDATE rental_items SET approved = 'approved' WHERE id = ?", (item_id,))
-        conn.commit()
-        conn.close()
+        db.execute("UPDATE rental_items SET approved = 'approved' WHERE id = ?", (item_id,))
 
     # Fetch user rentals
     def get_users_and_rented_items():
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
-        c.execute("SELECT id, owner, name, price, rented_by, borrow_date, return_date, approved, listing_type FROM rental_items")
-        data = c.fetchall()
-        conn.close()
-        return data
+        return db.query("SELECT id, owner, name, price, rented_by, borrow_date, return_date, approved, listing_type FROM rental_items")
     
     # Implement Peer Exchange based on chosen submenu
     if peer_choice == "Home":
@@ -415,49 +385,7 @@ def show():
             st.write(f"{icon} **{rental[1]}** listed **{rental[2]}** (₹{rental[3]}) - {rental[4] or 'Available'}")
 
 if __name__ == "__main__":
-    # Create necessary database tables when run standalone
-    def create_tables():
-        conn = sqlite3.connect("peer_resource_exchange.db")
-        c = conn.cursor()
-        
-        # Users table
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT
-            )
-        """)
-
-        # Rental items table - Add listing_type column if it doesn't exist
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS rental_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                owner TEXT,
-                name TEXT,
-                description TEXT,
-                price REAL,
-                image_path TEXT,
-                contact TEXT,
-                rented_by TEXT DEFAULT NULL,
-                borrow_date TEXT DEFAULT NULL,
-                return_date TEXT DEFAULT NULL,
-                approved TEXT DEFAULT 'pending',
-                listing_type TEXT DEFAULT 'item'
-            )
-        """)
-        
-        # Check if listing_type column exists, add it if not
-        try:
-            c.execute("SELECT listing_type FROM rental_items LIMIT 1")
-        except sqlite3.OperationalError:
-            # Column doesn't exist, add it
-            c.execute("ALTER TABLE rental_items ADD COLUMN listing_type TEXT DEFAULT 'item'")
-        
-        conn.commit()
-        conn.close()
-
-    # Setup for standalone run
-    create_tables()
+    # Setup for standalone run; get_db creates the tables
+    get_db()
     st.set_page_config(page_title="Peer Exchange Platform", page_icon="📌")
-    show()
\ No newline at end of file
+    show()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from caching import shared_instance, write_json_atomic
+from route_polyline import decode, encode
+
+ROUTE_CACHE_DIR = os.path.join("cache", "routes")
+
+# Routes kept in memory
+LRU_SIZE = 512
+
+# Routes on disk are refetched after a week
+TTL_SECONDS = 7 * 24 * 3600
+
+# Coordinates are rounded to 5 decimals (about 1 m) before building the key
+KEY_PRECISION = 5
+
+# Stored in every route file; files written in another format are dropped
+# and refetched
+CACHE_FORMAT = 2
+
+def route_key(start_coords, end_coords, profile="foot", precision=KEY_PRECISION):
+    """Cache key for a route between two quantized coordinates"""
+    start = ",".join(f"{c:.{precision}f}" for c in start_coords)
+    end = ",".join(f"{c:.{precision}f}" for c in end_coords)
+    return f"{profile}:{start};{end}"
+
+class RouteCache:
+    """Two-tier route cache: an in-memory LRU in front of JSON files with a TTL.
+
+    Both tiers hold route points as encoded polylines, which take a few bytes
+    per point instead of a tuple of two floats.
+    """
+
+    def __init__(self, cache_dir=ROUTE_CACHE_DIR, lru_size=LRU_SIZE, ttl=TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.lru_size = lru_size
+        self.ttl = ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key):
+        """Return the cached route for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self._lru.move_to_end(key)
+                    return self._decode(entry[1])
+                del self._lru[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if (data.get("format") != CACHE_FORMAT or data.get("key") != key
+                or now - data.get("created", 0) >= self.ttl):
+            self._remove(path)
+            return None
+
+        self._remember(key, data["created"], data["route"])
+        return self._decode(data["route"])
+
+    def put(self, key, route):
+        """Store a route in both tiers"""
+        created = time.time()
+        route = self._encode(route)
+        self._remember(key, created, route)
+
+        write_json_atomic(self._path(key), {"format": CACHE_FORMAT, "key": key, "created": created, "route": route})
+
+    def evict_expired(self):
+        """Delete expired route files; returns how many were removed"""
+        removed = 0
+        now = time.time()
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return 0
+
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if now - os.path.getmtime(path) >= self.ttl:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _remember(self, key, created, route):
+        with self._lock:
+            self._lru[key] = (created, route)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _encode(route):
+        return dict(route, route_points=encode(route["route_points"]))
+
+    @staticmethod
+    def _decode(route):
+        return dict(route, route_points=decode(route["route_points"]))
+
+@shared_instance
+def get_route_cache():
+    """Return the route cache shared by every session in this process"""
+    cache = RouteCache()
+    cache.evict_expired()
+    return cache
@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import threading
+
+from route_polyline import decode, encode
+
+ROUTE_MATRIX_FILE = "campus_route_matrix.json"
+
+# Coordinates are compared with 6 decimals (about 0.1 m), the precision
+# route points are encoded with
+COORD_DECIMALS = 6
+
+# Times each pair is routed before the build gives up on it
+ROUTE_ATTEMPTS = 3
+
+def build_route_matrix(locations, route_fn, out_path=ROUTE_MATRIX_FILE):
+    """Route every ordered pair of named locations and write them to one file.
+
+    ``locations`` maps names to (lat, lon); ``route_fn(start, end)`` returns a
+    route dict like ``campus_navigation.get_route``. A pair that still has no
+    route, or only a straight-line fallback, after ROUTE_ATTEMPTS tries fails
+    the build with RuntimeError and nothing is written. Returns the number of
+    routes written.
+    """
+    names = list(locations)
+    routes = []
+    missing = []
+    for i, source in enumerate(names):
+        for j, destination in enumerate(names):
+            if i == j:
+                continue
+            route = _route_pair(route_fn, locations[source], locations[destination])
+            if route is None:
+                missing.append(f"{source} -> {destination}")
+                continue
+            routes.append([
+                i, j,
+                round(route['distance'], 1),
+                round(route['duration'], 1),
+                encode(route['route_points']),
+                [[step['instruction'], round(step['distance'], 1)] for step in route['steps']],
+            ])
+    if missing:
+        raise RuntimeError(f"No route for {len(missing)} pairs: {', '.join(missing)}")
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "locations": [[name, *locations[name]] for name in names],
+            "routes": routes,
+        }, f, separators=(",", ":"))
+    return len(routes)
+
+def _route_pair(route_fn, start, end):
+    """A real route between two points, or None once every attempt failed or fell back"""
+    for _ in range(ROUTE_ATTEMPTS):
+        try:
+            route = route_fn(start, end)
+        except Exception:
+            continue
+        if route is not None and not route.get('fallback'):
+            return route
+    return None
+
+class RouteMatrix:
+    """Precomputed routes between named campus locations, looked up in O(1)"""
+
+    def __init__(self, locations, routes):
+        self.locations = locations
+        self._routes = routes
+
+    @classmethod
+    def load(cls, path=ROUTE_MATRIX_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        names = [entry[0] for entry in data["locations"]]
+        locations = {entry[0]: (entry[1], entry[2]) for entry in data["locations"]}
+        routes = {}
+        for i, j, distance, duration, points, steps in data["routes"]:
+            routes[(names[i], names[j])] = {
+                'route_points': decode(points),
+                'distance': distance,
+                'duration': duration,
+                'steps': [{'instruction': instruction, 'distance': d} for instruction, d in steps],
+            }
+        return cls(locations, routes)
+
+    def lookup(self, source_name, dest_name, source_coords=None, dest_coords=None):
+        """Return the stored route between two names, or None.
+
+        When coordinates are given the route is only returned if the stored
+        locations still match them, so moved locations fall back to live routing.
+        """
+        if source_coords is not None and not self._matches(source_name, source_coords):
+            return None
+        if dest_coords is not None and not self._matches(dest_name, dest_coords):
+            return None
+        return self._routes.get((source_name, dest_name))
+
+    def _matches(self, name, coords):
+        stored = self.locations.get(name)
+        return stored is not None and all(
+            round(a, COORD_DECIMALS) == round(b, COORD_DECIMALS) for a, b in zip(stored, coords)
+        )
+
+_matrix_lock = threading.Lock()
+_matrices = {}
+
+def load_route_matrix(path=ROUTE_MATRIX_FILE):
+    """Return the route matrix shared by every session, or None if it hasn't been built"""
+    with _matrix_lock:
+        if path not in _matrices:
+            _matrices[path] = RouteMatrix.load(path) if os.path.exists(path) else None
+        return _matrices[path]
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute routes between all named campus locations")
+    parser.add_argument("--output", default=ROUTE_MATRIX_FILE)
+    args = parser.parse_args()
+
+    # Imported here: the navigation page sets up Streamlit state on import
+    from campus_navigation import CAMPUS_LOCATIONS, ROUTING_BACKEND, fetch_osrm_route, get_local_route
+
+    def route_fn(start, end):
+        # OSRM is asked directly, without the page's time budget and circuit
+        # breaker, so a slow answer is waited for instead of replaced by a
+        # straight line
+        route = get_local_route(start, end) if ROUTING_BACKEND == 'local' else None
+        return route if route is not None else fetch_osrm_route(start, end)
+
+    count = build_route_matrix(CAMPUS_LOCATIONS, route_fn, args.output)
+    print(f"Wrote {count} routes to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import math
+
+import numpy as np
+
+from geo_index import EARTH_RADIUS_M
+
+# Encoded polylines keep 6 decimals, like OSRM's polyline6 (about 0.1 m)
+PRECISION = 6
+
+# A simplified route may stray this many screen pixels from the original
+PIXEL_TOLERANCE = 1.0
+
+def encode(points, precision=PRECISION):
+    """Encode (lat, lon) points with the Google encoded polyline algorithm"""
+    factor = 10 ** precision
+    chunks = []
+    previous = (0, 0)
+    for point in points:
+        current = (round(point[0] * factor), round(point[1] * factor))
+        for value in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous = current
+    return "".join(chunks)
+
+def decode(text, precision=PRECISION):
+    """Decode an encoded polyline into a list of (lat, lon) tuples"""
+    factor = 10 ** precision
+    points = []
+    index, lat, lon = 0, 0, 0
+    while index < len(text):
+        deltas = []
+        for _ in range(2):
+            shift, value = 0, 0
+            while True:
+                byte = ord(text[index]) - 63
+                index += 1
+                value |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(value >> 1) if value & 1 else value >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
+
+def meters_per_pixel(zoom, lat):
+    """Ground resolution of a 256 px web mercator tile at a zoom level and latitude"""
+    return 2 * math.pi * EARTH_RADIUS_M * math.cos(math.radians(lat)) / (256 * 2 ** zoom)
+
+def _segment_distances(points, a, b):
+    # Distance from each point to the segment a-b, in the units of the inputs
+    ab = b - a
+    length2 = ab @ ab
+    if length2 == 0:
+        return np.hypot(*(points - a).T)
+    t = np.clip((points - a) @ ab / length2, 0, 1)
+    return np.hypot(*(points - (a + t[:, None] * ab)).T)
+
+def simplify(points, tolerance_m):
+    """Douglas-Peucker: drop points that stray less than tolerance_m metres from the line.
+
+    Points are projected onto a local equirectangular plane, which is exact
+    to well under a centimetre across a campus. The first and last points
+    are always kept.
+    """
+    n = len(points)
+    if n < 3 or tolerance_m <= 0:
+        return list(points)
+
+    coords = np.radians(np.asarray(points, dtype=float))
+    xy = np.column_stack((coords[:, 1] * math.cos(coords[:, 0].mean()), coords[:, 0])) * EARTH_RADIUS_M
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(xy[first + 1:last], xy[first], xy[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack.append((first, middle))
+            stack.append((middle, last))
+
+    return [points[i] for i in np.flatnonzero(keep)]
+
+def simplify_for_zoom(points, zoom, pixels=PIXEL_TOLERANCE):
+    """Simplify a route so it is indistinguishable from the original at zoom and below"""
+    if len(points) < 3:
+        return list(points)
+    tolerance = pixels * meters_per_pixel(zoom, points[0][0])
+    return simplify(points, tolerance)
+
+def _local_xy(points, ref_lat):
+    # Metres on an equirectangular plane through ref_lat, like simplify uses
+    coords = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    return np.column_stack((coords[:, 1] * math.cos(math.radians(ref_lat)), coords[:, 0])) * EARTH_RADIUS_M
+
+def route_progress(points):
+    """Distance in metres from the start of a route to each of its points"""
+    if len(points) == 0:
+        return []
+    xy = _local_xy(points, points[0][0])
+    steps = np.hypot(*np.diff(xy, axis=0).T)
+    return [0.0] + np.cumsum(steps).tolist()
+
+def remaining_distance(points, position, progress=None):
+    """(metres left along the route, metres off the route) for a position near it.
+
+    The position is projected onto the closest segment, so a walker halfway
+    along a long straight segment gets credit for the half already walked.
+    """
+    if len(points) == 0:
+        return 0.0, 0.0
+    if progress is None:
+        progress = route_progress(points)
+    xy = _local_xy(points, points[0][0])
+    p = _local_xy([position], points[0][0])[0]
+    if len(points) == 1:
+        return 0.0, float(np.hypot(*(p - xy[0])))
+
+    a, ab = xy[:-1], np.diff(xy, axis=0)
+    length2 = np.einsum("ij,ij->i", ab, ab)
+    t = np.clip(np.einsum("ij,ij->i", p - a, ab) / np.where(length2 > 0, length2, 1), 0, 1)
+    offsets = np.hypot(*(a + t[:, None] * ab - p).T)
+    i = int(np.argmin(offsets))
+    walked = progress[i] + t[i] * (progress[i + 1] - progress[i])
+    return float(progress[-1] - walked), float(offsets[i])
@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from route_cache import route_key
+
+# Concurrent background route requests
+PREFETCH_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="route-prefetch")
+_lock = threading.Lock()
+_inflight = {}
+
+def _forget(key, future):
+    with _lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+def prefetch_routes(start_coords, destinations, route_fn, profile='foot'):
+    """Resolve routes from start_coords to each destination in the background.
+
+    ``route_fn(start, end)`` is expected to store its result in the route
+    cache (``campus_navigation.get_route`` does). Routes already being
+    fetched are not requested twice. Returns the futures by cache key.
+    """
+    futures, submitted = {}, []
+    with _lock:
+        for end_coords in destinations:
+            key = route_key(start_coords, end_coords, profile)
+            future = _inflight.get(key)
+            if future is None:
+                future = _executor.submit(route_fn, start_coords, end_coords)
+                _inflight[key] = future
+                submitted.append((key, future))
+            futures[key] = future
+    
+    # Outside the lock: a future that has already finished runs its callback
+    # immediately, and _forget takes the lock
+    for key, future in submitted:
+        future.add_done_callback(lambda f, key=key: _forget(key, f))
+    return futures
+
+def pending_route(start_coords, end_coords, profile='foot'):
+    """The in-flight prefetch for a route, or None"""
+    with _lock:
+        return _inflight.get(route_key(start_coords, end_coords, profile))
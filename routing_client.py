@@ -0,0 +1,209 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from route_cache import route_key
+
+# How long a page render waits for the routing backend before showing the fallback
+LATENCY_BUDGET = 0.8
+
+# Concurrent backend requests
+ROUTING_WORKERS = 4
+
+# Requests allowed to queue behind the workers; past this new trips get the
+# fallback straight away instead of piling up behind a stalled backend
+MAX_PENDING = 4 * ROUTING_WORKERS
+
+# Consecutive failures that open the circuit
+FAILURE_THRESHOLD = 3
+
+# Seconds the circuit stays open before one probe request is let through;
+# doubled after every failed probe up to MAX_RESET_TIMEOUT
+RESET_TIMEOUT = 30
+MAX_RESET_TIMEOUT = 300
+
+# Responses slower than this count as failures for the breaker
+SLOW_CALL_SECONDS = 3.0
+
+# Weight of the newest sample in the moving average latency
+LATENCY_ALPHA = 0.3
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+class BackendHealth:
+    """Moving average latency and outcome counts of a routing backend"""
+
+    def __init__(self, alpha=LATENCY_ALPHA):
+        self.alpha = alpha
+        self.latency = None
+        self.successes = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok, error=None):
+        with self._lock:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.alpha * (latency - self.latency)
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+                self.last_error = error
+            if latency > SLOW_CALL_SECONDS:
+                self.slow_calls += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'latency': self.latency,
+                'successes': self.successes,
+                'failures': self.failures,
+                'slow_calls': self.slow_calls,
+                'last_error': self.last_error,
+            }
+
+class CircuitBreaker:
+    """Stops calling a backend after repeated failures and probes it again later"""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Whether a request may be sent now; in half-open only one probe is"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._probing or self.clock() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+            self.reset_timeout = self.base_timeout
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing:
+                # The probe failed: stay open for longer
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            if self._probing or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self.clock()
+            self._probing = False
+
+class RoutingClient:
+    """Calls a routing backend within a latency budget.
+
+    ``fetch(start, end, profile)`` returns a route dict or None when the
+    backend has no route, and raises when the backend fails. Requests that
+    miss the budget keep running in the background and hand their route to
+    ``on_result(key, route)``, so a later render picks it up from the cache.
+    """
+
+    def __init__(self, fetch, on_result=None, budget=LATENCY_BUDGET, workers=ROUTING_WORKERS,
+                 breaker=None, health=None):
+        self.fetch = fetch
+        self.on_result = on_result
+        self.budget = budget
+        self.breaker = breaker or CircuitBreaker()
+        self.health = health or BackendHealth()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="routing")
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def route(self, start_coords, end_coords, profile='foot', budget=None):
+        """Return the backend's route, or None if it has none, failed or is still working"""
+        key = route_key(start_coords, end_coords, profile)
+        submitted = False
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is None:
+                if len(self._inflight) >= MAX_PENDING or not self.breaker.allow():
+                    return None
+                future = self._executor.submit(self._call, start_coords, end_coords, profile)
+                entry = self._inflight[key] = (future, time.monotonic())
+                submitted = True
+            future = entry[0]
+        # Outside the lock: a finished future runs the callback at once, and
+        # _finish takes the lock
+        if submitted:
+            future.add_done_callback(lambda f, key=key: self._finish(key, f))
+
+        if budget is None:
+            budget = self.budget
+        # A backend that has been slower than the budget lately isn't waited for at all
+        if self.expected_latency() > budget:
+            budget = 0
+
+        done, _ = wait([future], timeout=budget)
+        if not done or future.exception() is not None:
+            return None
+        return future.result()
+
+    def expected_latency(self):
+        """Recent latency, or how long the oldest unanswered request has been waiting if that's longer"""
+        now = time.monotonic()
+        with self._lock:
+            stalled = max((now - started for _, started in self._inflight.values()), default=0.0)
+        return max(self.health.latency or 0.0, stalled)
+
+    def status(self):
+        """Breaker state and health figures, for display and benchmarks"""
+        return dict(self.health.snapshot(), state=self.breaker.state, inflight=len(self._inflight))
+
+    def _call(self, start_coords, end_coords, profile):
+        t0 = time.monotonic()
+        try:
+            route = self.fetch(start_coords, end_coords, profile)
+        except Exception as e:
+            self.health.record(time.monotonic() - t0, False, repr(e))
+            self.breaker.record_failure()
+            raise
+
+        latency = time.monotonic() - t0
+        self.health.record(latency, True)
+        if latency > SLOW_CALL_SECONDS:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return route
+
+    def _finish(self, key, future):
+        # Hand the route over before dropping the in-flight entry so no caller
+        # misses both
+        if self.on_result is not None and future.exception() is None and future.result() is not None:
+            try:
+                self.on_result(key, future.result())
+            except Exception:
+                pass
+        with self._lock:
+            if key in self._inflight and self._inflight[key][0] is future:
+                del self._inflight[key]
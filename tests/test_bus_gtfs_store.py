@@ -0,0 +1,36 @@
+from bus_data import format_departure
+from bus_gtfs_store import StoreTimetable, import_feed, parse_gtfs_time, read_stop_table
+
+def write_feed(folder, stop_times):
+    files = {
+        "stops.txt": "stop_id,stop_name,stop_lat,stop_lon\nA,Alpha,13.0,80.0\nB,Beta,13.01,80.01\n",
+        "routes.txt": "route_id,route_short_name\nN1,Night 1\n",
+        "trips.txt": "route_id,service_id,trip_id\nN1,S,T1\n",
+        "stop_times.txt": "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n" + stop_times,
+    }
+    for name, text in files.items():
+        (folder / name).write_text(text)
+    return folder
+
+def test_format_departure_within_the_day():
+    assert format_departure(0) == "12:00 AM"
+    assert format_departure(5 * 60 + 45) == "5:45 AM"
+    assert format_departure(12 * 60) == "12:00 PM"
+    assert format_departure(23 * 60 + 59) == "11:59 PM"
+    assert format_departure(-1) == "--"
+
+def test_format_departure_after_midnight():
+    assert format_departure(parse_gtfs_time("24:00:00")) == "12:00 AM (+1)"
+    assert format_departure(parse_gtfs_time("25:00:00")) == "1:00 AM (+1)"
+    assert format_departure(parse_gtfs_time("49:30:00")) == "1:30 AM (+2)"
+
+def test_after_midnight_trip(tmp_path):
+    feed = write_feed(tmp_path, "T1,23:50:00,23:50:00,A,1\nT1,25:00:00,25:00:00,B,2\n")
+    db = str(tmp_path / "store.db")
+    counts = import_feed(str(feed), db)
+    assert counts["stop_times"] == 2
+
+    assert StoreTimetable(db).next_departures("Beta", 0) == [(25 * 60, "Night 1")]
+    table = read_stop_table(db)
+    labels = dict(zip(table["Bus Stop"], table["Time"]))
+    assert labels == {"Alpha": "11:50 PM", "Beta": "1:00 AM (+1)"}
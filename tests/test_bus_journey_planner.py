@@ -0,0 +1,41 @@
+from bus_journey_planner import Pattern, TransitNetwork
+
+STOPS = {
+    "A": (13.000, 80.000),
+    "B": (13.010, 80.000),
+    "C": (13.020, 80.000),
+    "C2": (13.0225, 80.000),  # about 280 m from C, a 4 minute walk
+    "D": (13.010, 80.020),
+    "E": (13.030, 80.020),
+}
+
+def network():
+    names = list(STOPS)
+    ids = {name: i for i, name in enumerate(names)}
+    patterns = [
+        Pattern("1", [ids["A"], ids["B"], ids["C"]], [(600, 610, 620)]),
+        Pattern("2", [ids["B"], ids["D"]], [(605, 615), (615, 625)]),
+        Pattern("3", [ids["C2"], ids["E"]], [(622, 637), (630, 645)]),
+    ]
+    lats, lons = zip(*STOPS.values())
+    return TransitNetwork(names, lats, lons, patterns)
+
+def test_transfer_at_a_shared_stop():
+    legs = network().plan("A", "D", 590)
+    assert legs == [
+        {'mode': 'bus', 'route': '1', 'from': 'A', 'to': 'B', 'depart': 600, 'arrive': 610},
+        {'mode': 'bus', 'route': '2', 'from': 'B', 'to': 'D', 'depart': 615, 'arrive': 625},
+    ]
+
+def test_walking_transfer_misses_the_bus_it_cannot_reach():
+    legs = network().plan("A", "E", 590)
+    assert [(leg['mode'], leg['from'], leg['to']) for leg in legs] == [
+        ('bus', 'A', 'C'), ('walk', 'C', 'C2'), ('bus', 'C2', 'E'),
+    ]
+    # Arriving at C at 620 plus the walk is too late for the 622 departure
+    assert legs[1]['minutes'] == 4
+    assert (legs[2]['depart'], legs[2]['arrive']) == (630, 645)
+
+def test_ride_limit():
+    assert network().plan("A", "D", 590, max_rides=1) is None
+    assert network().plan("A", "D", 601) is None
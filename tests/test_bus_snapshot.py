@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from bus_data import read_bus_data
+from bus_snapshot import Snapshot, load_snapshot, snapshot_path, write_snapshot
+from bus_timetable import TimetableIndex
+from geo_index import GeoIndex
+
+ROWS = (
+    "Bus Route,Bus Stop,Time,Latitude,Longitude\n"
+    "1.Ennore,Ennore Bus Stand,5.45 am,13.1721,80.3051\n"
+    "1.Ennore,Ernavur,5.48 am,13.166189,80.298858\n"
+    "2.Avadi,Ernavur,6.10 am,13.166189,80.298858\n"
+    "2.Avadi,Avadi,6.40 pm,13.1147,80.1015\n"
+)
+
+def write_csv(folder, text=ROWS):
+    source = folder / "buses.csv"
+    source.write_text(text)
+    return str(source)
+
+def test_round_trip(tmp_path):
+    source = write_csv(tmp_path)
+    path = snapshot_path(source, str(tmp_path / "cache"))
+    write_snapshot(source, path)
+    snapshot = Snapshot(path)
+    df = read_bus_data(source)
+
+    for column in ('Bus Route', 'Bus Stop', 'Time', 'Departure'):
+        assert list(snapshot.data[column]) == list(df[column])
+    for column in ('Latitude', 'Longitude'):
+        assert np.allclose(snapshot.data[column], df[column])
+    assert isinstance(snapshot.data['Bus Stop'].dtype, pd.CategoricalDtype)
+
+    index = GeoIndex(df['Latitude'].to_numpy(dtype=float), df['Longitude'].to_numpy(dtype=float))
+    for found, expected in zip(snapshot.index.nearest(13.16, 80.29, 3), index.nearest(13.16, 80.29, 3)):
+        assert np.allclose(found, expected)
+
+    timetable = TimetableIndex.from_dataframe(df)
+    for stop in ("Ennore Bus Stand", "Ernavur", "Avadi"):
+        assert snapshot.timetable.next_departures(stop, 0) == timetable.next_departures(stop, 0)
+    assert snapshot.timetable.next_departures("Ernavur", 0) == [(5 * 60 + 48, "1.Ennore"), (6 * 60 + 10, "2.Avadi")]
+
+def test_rebuilt_when_the_source_changes(tmp_path):
+    source = write_csv(tmp_path)
+    cache = str(tmp_path / "cache")
+    assert len(load_snapshot(source, cache).data) == 4
+
+    write_csv(tmp_path, ROWS + "2.Avadi,Avadi,7.40 pm,13.1147,80.1015\n")
+    snapshot = load_snapshot(source, cache)
+    assert snapshot.is_fresh(source)
+    assert len(snapshot.data) == 5
@@ -0,0 +1,13 @@
+from bus_stop_finder import next_departures_near
+
+def test_blank_stop_is_skipped(tmp_path):
+    csv = tmp_path / "buses.csv"
+    csv.write_text(
+        "Bus Route,Bus Stop,Time,Latitude,Longitude\n"
+        "1.Ennore,Ennore Bus Stand,5.45 am,13.1721,80.3051\n"
+        "1.Ennore,,5.48 am,13.166189,80.298858\n"
+    )
+    departures = next_departures_near(13.17, 80.30, 0, path=str(csv))
+    assert [(d['stop'], d['route'], d['departure']) for d in departures] == [
+        ("Ennore Bus Stand", "1.Ennore", 5 * 60 + 45)
+    ]
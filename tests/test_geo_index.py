@@ -0,0 +1,35 @@
+import numpy as np
+
+from geo_index import GeoIndex, haversine_km
+
+def random_points(rng, n):
+    return rng.uniform(12.9, 13.2, n), rng.uniform(80.0, 80.3, n)
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(2)
+    lats, lons = random_points(rng, 500)
+    index = GeoIndex(lats, lons, leaf_size=8)
+    for lat, lon in zip(*random_points(rng, 50)):
+        distances = haversine_km(lat, lon, lats, lons)
+        expected = np.argsort(distances, kind="stable")[:5]
+
+        found, found_km = index.nearest(lat, lon, 5)
+        assert list(found) == list(expected)
+        assert np.allclose(found_km, distances[expected])
+
+def test_within_matches_brute_force():
+    rng = np.random.default_rng(3)
+    lats, lons = random_points(rng, 500)
+    index = GeoIndex(lats, lons, leaf_size=8)
+    for lat, lon in zip(*random_points(rng, 50)):
+        distances = haversine_km(lat, lon, lats, lons)
+
+        found, found_km = index.within(lat, lon, 3.0)
+        assert sorted(found) == list(np.flatnonzero(distances <= 3.0))
+        assert np.allclose(found_km, distances[found])
+        assert list(found_km) == sorted(found_km)
+
+def test_nearest_on_an_empty_index():
+    index = GeoIndex([], [])
+    found, found_km = index.nearest(13.0, 80.0, 3)
+    assert len(found) == 0 and len(found_km) == 0
@@ -0,0 +1,19 @@
+import random
+
+from route_polyline import decode, encode
+
+def test_round_trip():
+    rng = random.Random(17)
+    points = [(round(rng.uniform(-90, 90), 6), round(rng.uniform(-180, 180), 6)) for _ in range(200)]
+    assert decode(encode(points)) == points
+    assert decode(encode([])) == []
+
+def test_rounds_to_the_precision():
+    points = [(13.0087654321, 80.0041234567), (13.0087654321, 80.0041234567)]
+    assert decode(encode(points)) == [(13.008765, 80.004123)] * 2
+
+def test_google_reference_polyline():
+    # The example from Google's encoded polyline documentation, at 5 decimals
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode(points, precision=5) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode("_p~iF~ps|U_ulLnnqC_mqNvxq`@", precision=5) == points
@@ -0,0 +1,67 @@
+from routing_client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, reset_timeout=30, max_reset_timeout=100, clock=clock)
+
+def test_opens_after_repeated_failures():
+    cb = breaker(FakeClock())
+    for _ in range(2):
+        cb.record_failure()
+    assert cb.state == CLOSED and cb.allow()
+
+    cb.record_failure()
+    assert cb.state == OPEN
+    assert not cb.allow()
+
+def test_success_resets_the_failure_count():
+    cb = breaker(FakeClock())
+    cb.record_failure()
+    cb.record_failure()
+    cb.record_success()
+    cb.record_failure()
+    assert cb.state == CLOSED
+
+def test_half_open_lets_one_probe_through():
+    clock = FakeClock()
+    cb = breaker(clock)
+    for _ in range(3):
+        cb.record_failure()
+
+    clock.now = 29.9
+    assert cb.state == OPEN and not cb.allow()
+    clock.now = 30
+    assert cb.state == HALF_OPEN
+    assert cb.allow()
+    assert not cb.allow()
+
+    cb.record_success()
+    assert cb.state == CLOSED and cb.allow()
+
+def test_failed_probe_backs_off():
+    clock = FakeClock()
+    cb = breaker(clock)
+    for _ in range(3):
+        cb.record_failure()
+
+    # Each failed probe doubles the wait, up to max_reset_timeout
+    clock.now = 30
+    for wait in (60, 100, 100):
+        assert cb.allow()
+        cb.record_failure()
+        assert cb.reset_timeout == wait
+        assert cb.state == OPEN
+        clock.now += wait - 0.1
+        assert not cb.allow()
+        clock.now += 0.1
+
+    # A successful probe restores the original timeout
+    assert cb.allow()
+    cb.record_success()
+    assert cb.reset_timeout == 30
@@ -0,0 +1,216 @@
+import argparse
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from caching import write_atomic
+from campus_registry import load_registry
+
+TILE_CACHE_DIR = os.path.join("cache", "tiles")
+
+# Upstream layers served by the proxy, by the name used in its URLs
+TILE_SOURCES = {
+    "satellite": "https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}",
+    "hybrid": "https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
+}
+
+# Cached tiles are refetched after 30 days, but an old tile is still served
+# when the upstream server can't be reached
+TILE_TTL_SECONDS = 30 * 24 * 3600
+
+# How long browsers may keep a tile the proxy served
+BROWSER_MAX_AGE = 24 * 3600
+
+# Prefetching covers the campus plus this margin
+BOUNDS_MARGIN_M = 300
+DEFAULT_ZOOMS = (15, 19)
+
+# The server only serves tiles over the campus area at these zooms, so
+# panning away can't fill the disk or load the upstream server. Below 15
+# the whole campus fits in a handful of tiles.
+SERVE_ZOOMS = (12, 19)
+
+UPSTREAM_TIMEOUT = 10
+PREFETCH_WORKERS = 8
+USER_AGENT = "campus_navigation_tile_proxy"
+
+def campus_bounds(margin_m=BOUNDS_MARGIN_M):
+    """(south, north, west, east) around every registered campus place"""
+    coords = list(load_registry().locations.values())
+    if not coords:
+        raise ValueError("The campus registry has no places to take bounds from")
+    lats = [lat for lat, _ in coords]
+    lons = [lon for _, lon in coords]
+    d_lat = margin_m / 111320
+    d_lon = margin_m / (111320 * math.cos(math.radians(sum(lats) / len(lats))))
+    return min(lats) - d_lat, max(lats) + d_lat, min(lons) - d_lon, max(lons) + d_lon
+
+def tile_xy(lat, lon, zoom):
+    """Web mercator tile containing a point"""
+    n = 2 ** zoom
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tiles_in_bounds(bounds, zoom):
+    """Every (zoom, x, y) tile covering (south, north, west, east)"""
+    south, north, west, east = bounds
+    x0, y0 = tile_xy(north, west, zoom)
+    x1, y1 = tile_xy(south, east, zoom)
+    return [(zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+def content_type(data):
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    return "application/octet-stream"
+
+class TileCache:
+    """Map tiles stored on disk and fetched from the upstream layer on a miss"""
+
+    def __init__(self, cache_dir=TILE_CACHE_DIR, sources=TILE_SOURCES, ttl=TILE_TTL_SECONDS, bounds=None,
+                 zooms=SERVE_ZOOMS):
+        self.cache_dir = cache_dir
+        self.sources = sources
+        self.ttl = ttl
+        self.bounds = bounds
+        self.zooms = zooms
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+
+    def covers(self, z, x, y):
+        """Whether the server may serve a tile: inside the zoom range and bounds, when bounds are set"""
+        if not self.zooms[0] <= z <= self.zooms[1]:
+            return False
+        if self.bounds is None:
+            return True
+        south, north, west, east = self.bounds
+        x0, y0 = tile_xy(north, west, z)
+        x1, y1 = tile_xy(south, east, z)
+        return x0 <= x <= x1 and y0 <= y <= y1
+
+    def path(self, layer, z, x, y):
+        return os.path.join(self.cache_dir, layer, str(z), str(x), str(y))
+
+    def get(self, layer, z, x, y):
+        """Tile bytes, or None when it isn't cached and can't be fetched"""
+        if layer not in self.sources:
+            raise KeyError(layer)
+
+        path = self.path(layer, z, x, y)
+        cached = None
+        try:
+            if time.time() - os.path.getmtime(path) < self.ttl:
+                with open(path, "rb") as f:
+                    return f.read()
+            with open(path, "rb") as f:
+                cached = f.read()
+        except OSError:
+            pass
+
+        try:
+            data = self.fetch(layer, z, x, y)
+        except requests.RequestException:
+            # Offline or upstream down: an expired tile beats no tile
+            return cached
+        write_atomic(path, data)
+        return data
+
+    def fetch(self, layer, z, x, y):
+        response = self.session.get(self.sources[layer].format(x=x, y=y, z=z), timeout=UPSTREAM_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+
+    def prefetch(self, layers, zooms, bounds, workers=PREFETCH_WORKERS):
+        """Download every tile of layers at zooms inside bounds; returns (tiles, failures)"""
+        jobs = [(layer, *tile) for layer in layers for zoom in zooms for tile in tiles_in_bounds(bounds, zoom)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda job: self.get(*job), jobs))
+        return len(jobs), sum(result is None for result in results)
+
+class TileHandler(BaseHTTPRequestHandler):
+    """Serves /<layer>/<z>/<x>/<y> from the server's tile cache"""
+
+    def do_GET(self):
+        try:
+            layer, z, x, y = self.path.split("?")[0].strip("/").split("/")
+            z, x, y = int(z), int(x), int(y)
+        except ValueError:
+            return self._reply(400, b"Expected /<layer>/<z>/<x>/<y>", "text/plain")
+
+        if not self.server.tiles.covers(z, x, y):
+            return self._reply(404, b"Tile outside the campus area", "text/plain")
+        try:
+            data = self.server.tiles.get(layer, z, x, y)
+        except KeyError:
+            return self._reply(404, f"Unknown layer {layer}".encode("utf-8"), "text/plain")
+        if data is None:
+            return self._reply(502, b"Tile unavailable", "text/plain")
+        self._reply(200, data, content_type(data))
+
+    def _reply(self, status, body, kind):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if status == 200:
+                self.send_header("Cache-Control", f"public, max-age={BROWSER_MAX_AGE}")
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            # The browser moved on before the tile arrived
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def start_tile_server(port=0, tiles=None, host="127.0.0.1"):
+    """Serve tiles from a daemon thread; returns the server and its base URL.
+
+    The default cache only serves tiles over the campus at SERVE_ZOOMS.
+    """
+    server = ThreadingHTTPServer((host, port), TileHandler)
+    server.daemon_threads = True
+    server.tiles = tiles or TileCache(bounds=campus_bounds())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Caching proxy for the campus map tiles")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="serve tiles to the navigation map")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--zoom", type=int, nargs=2, default=list(SERVE_ZOOMS), metavar=("MIN", "MAX"))
+    serve.add_argument("--margin", type=float, default=BOUNDS_MARGIN_M, help="metres around the campus")
+
+    prefetch = commands.add_parser("prefetch", help="download the campus tiles for a zoom range")
+    prefetch.add_argument("--zoom", type=int, nargs=2, default=list(DEFAULT_ZOOMS), metavar=("MIN", "MAX"))
+    prefetch.add_argument("--layers", nargs="+", default=list(TILE_SOURCES), choices=list(TILE_SOURCES))
+    prefetch.add_argument("--margin", type=float, default=BOUNDS_MARGIN_M, help="metres around the campus")
+    args = parser.parse_args()
+
+    if args.command == "prefetch":
+        zooms = range(args.zoom[0], args.zoom[1] + 1)
+        count, failed = TileCache().prefetch(args.layers, zooms, campus_bounds(args.margin))
+        print(f"Cached {count - failed} of {count} tiles in {TILE_CACHE_DIR}")
+        return
+
+    tiles = TileCache(bounds=campus_bounds(args.margin), zooms=tuple(args.zoom))
+    server, url = start_tile_server(args.port, tiles, host=args.host)
+    print(f"Serving campus tiles on {url}; set CAMPUS_TILE_URL to the address browsers reach it on")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
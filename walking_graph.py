@@ -0,0 +1,275 @@
+import argparse
+import glob
+import heapq
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from geo_index import WALKING_SPEED, GeoIndex, haversine_km
+
+WALKING_GRAPH_FILE = "campus_walk_graph.json"
+
+# Points further than this from the path network aren't routed locally
+MAX_SNAP_METERS = 250
+
+# Bearing changes smaller than this are treated as walking straight on
+TURN_THRESHOLD = 30
+
+# OSM ways pedestrians can't use
+EXCLUDED_HIGHWAYS = {"motorway", "motorway_link", "construction", "proposed"}
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres between two points"""
+    return float(haversine_km(lat1, lon1, lat2, lon2)) * 1000
+
+def bearing(lat1, lon1, lat2, lon2):
+    """Initial bearing in degrees from the first point to the second"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    x = math.sin(lon2 - lon1) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(lon2 - lon1)
+    return (math.degrees(math.atan2(x, y)) + 360) % 360
+
+def turn_modifier(change):
+    """OSRM-style modifier for a bearing change in degrees (-180, 180]"""
+    side = "right" if change > 0 else "left"
+    change = abs(change)
+    if change < TURN_THRESHOLD:
+        return "straight"
+    if change < 60:
+        return f"slight {side}"
+    if change < 135:
+        return side
+    return f"sharp {side}"
+
+def _walkable(tags):
+    return (
+        tags.get("highway") not in EXCLUDED_HIGHWAYS
+        and tags.get("foot") != "no"
+        and tags.get("motorroad") != "yes"
+    )
+
+def build_graph_file(overpass_files, out_path=WALKING_GRAPH_FILE):
+    """Extract the walkable OSM ways from Overpass responses into a graph file.
+
+    Only the largest connected component is kept so every snapped point can
+    reach every other one.
+    """
+    coords, ways = {}, {}
+    for path in overpass_files:
+        with open(path, "r", encoding="utf-8") as f:
+            elements = json.load(f).get("elements", [])
+        for element in elements:
+            if element["type"] == "node":
+                coords[element["id"]] = (element["lat"], element["lon"])
+            elif element["type"] == "way" and "highway" in element.get("tags", {}):
+                if _walkable(element["tags"]):
+                    ways[element["id"]] = element["nodes"]
+
+    adjacency = {}
+    for nodes in ways.values():
+        for u, v in zip(nodes, nodes[1:]):
+            if u in coords and v in coords and u != v:
+                adjacency.setdefault(u, set()).add(v)
+                adjacency.setdefault(v, set()).add(u)
+
+    # Largest connected component
+    component, seen = [], set()
+    for start in adjacency:
+        if start in seen:
+            continue
+        stack, members = [start], []
+        seen.add(start)
+        while stack:
+            node = stack.pop()
+            members.append(node)
+            for other in adjacency[node]:
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        if len(members) > len(component):
+            component = members
+
+    ids = {node: i for i, node in enumerate(sorted(component))}
+    nodes = [[node, round(coords[node][0], 7), round(coords[node][1], 7)] for node in sorted(component)]
+    edges = []
+    for u in sorted(component):
+        for v in sorted(adjacency[u]):
+            if u < v:
+                length = haversine_m(*coords[u], *coords[v])
+                edges.append([ids[u], ids[v], round(length, 2)])
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"source": "OpenStreetMap contributors (ODbL)", "nodes": nodes, "edges": edges}, f,
+                  separators=(",", ":"))
+    return len(nodes), len(edges)
+
+class WalkingGraph:
+    """Undirected campus path network routed with A*"""
+
+    def __init__(self, lats, lons, edges, osm_ids=None):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.osm_ids = osm_ids
+        self.adjacency = [[] for _ in range(len(self.lats))]
+        for u, v, length in edges:
+            self.adjacency[u].append((v, length))
+            self.adjacency[v].append((u, length))
+        self.index = GeoIndex(self.lats, self.lons)
+        self._lat_list = self.lats.tolist()
+        self._lon_list = self.lons.tolist()
+
+    @classmethod
+    def load(cls, path=WALKING_GRAPH_FILE):
+        """Load a graph file written by ``build_graph_file``"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        nodes = data["nodes"]
+        return cls(
+            [node[1] for node in nodes],
+            [node[2] for node in nodes],
+            [(u, v, length) for u, v, length in data["edges"]],
+            [node[0] for node in nodes]
+        )
+
+    def __len__(self):
+        return len(self.lats)
+
+    def nearest_node(self, coords):
+        """Return (node, distance_m) of the graph node closest to coords"""
+        nodes, distances = self.index.nearest(coords[0], coords[1], 1)
+        return int(nodes[0]), float(distances[0]) * 1000
+
+    def node_coords(self, node):
+        return (self._lat_list[node], self._lon_list[node])
+
+    def _heuristic(self, node, target):
+        return haversine_m(self._lat_list[node], self._lon_list[node], self._lat_list[target], self._lon_list[target])
+
+    def shortest_path(self, source, target):
+        """A* search; returns (node list, length_m) or (None, inf) if unreachable"""
+        if source == target:
+            return [source], 0.0
+
+        best = {source: 0.0}
+        came_from = {}
+        queue = [(self._heuristic(source, target), 0.0, source)]
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == target:
+                path = [node]
+                while node in came_from:
+                    node = came_from[node]
+                    path.append(node)
+                return path[::-1], cost
+            if cost > best.get(node, math.inf):
+                continue
+
+            for other, length in self.adjacency[node]:
+                new_cost = cost + length
+                if new_cost < best.get(other, math.inf):
+                    best[other] = new_cost
+                    came_from[other] = node
+                    heapq.heappush(queue, (new_cost + self._heuristic(other, target), new_cost, other))
+
+        return None, math.inf
+
+    def distances_within(self, source, limit_m):
+        """Bounded Dijkstra sweep: {node: walking metres} for every node within limit_m of source"""
+        best = {source: 0.0}
+        done = {}
+        queue = [(0.0, source)]
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node in done:
+                continue
+            done[node] = cost
+            for other, length in self.adjacency[node]:
+                new_cost = cost + length
+                if new_cost <= limit_m and new_cost < best.get(other, math.inf):
+                    best[other] = new_cost
+                    heapq.heappush(queue, (new_cost, other))
+        return done
+
+    def reachable_points(self, distances, limit_m):
+        """Reached nodes plus the points part-way along edges where the walking budget runs out"""
+        points = [self.node_coords(node) for node in distances]
+        for node, cost in distances.items():
+            left = limit_m - cost
+            for other, length in self.adjacency[node]:
+                if other not in distances and length > 0:
+                    fraction = min(left / length, 1.0)
+                    lat, lon = self.node_coords(node)
+                    other_lat, other_lon = self.node_coords(other)
+                    points.append((lat + (other_lat - lat) * fraction, lon + (other_lon - lon) * fraction))
+        return points
+
+    def route(self, start_coords, end_coords, max_snap=MAX_SNAP_METERS):
+        """Walking route in the same shape as ``campus_navigation.get_route``.
+
+        Both ends are snapped to their nearest path node. Returns None when
+        either end is more than max_snap metres from the network.
+        """
+        if len(self) == 0:
+            return None
+        source, source_gap = self.nearest_node(start_coords)
+        target, target_gap = self.nearest_node(end_coords)
+        if source_gap > max_snap or target_gap > max_snap:
+            return None
+
+        path, length = self.shortest_path(source, target)
+        if path is None:
+            return None
+
+        route_points = [tuple(start_coords)] + [self.node_coords(node) for node in path] + [tuple(end_coords)]
+        distance = source_gap + length + target_gap
+        return {
+            'route_points': route_points,
+            'distance': distance,
+            'duration': distance / WALKING_SPEED,
+            'steps': route_steps(route_points)
+        }
+
+def route_steps(points):
+    """Turn-by-turn steps for a polyline, in the format OSRM steps are converted to"""
+    # Drop zero-length segments, which have no bearing
+    points = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+    if len(points) < 2:
+        return []
+
+    steps = [{'instruction': 'depart', 'distance': 0.0}]
+    previous = None
+    for a, b in zip(points, points[1:]):
+        heading = bearing(*a, *b)
+        if previous is not None:
+            change = (heading - previous + 180) % 360 - 180
+            if abs(change) >= TURN_THRESHOLD:
+                steps.append({'instruction': f"turn {turn_modifier(change)}", 'distance': 0.0})
+        steps[-1]['distance'] += haversine_m(*a, *b)
+        previous = heading
+    return steps
+
+_graph_lock = threading.Lock()
+_graphs = {}
+
+def load_walking_graph(path=WALKING_GRAPH_FILE):
+    """Return the walking graph shared by every session, or None if the file is missing"""
+    with _graph_lock:
+        if path not in _graphs:
+            _graphs[path] = WalkingGraph.load(path) if os.path.exists(path) else None
+        return _graphs[path]
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the campus walking graph from cached Overpass responses")
+    parser.add_argument("inputs", nargs="*", help="Overpass JSON files (default: cache/*.json)")
+    parser.add_argument("--output", default=WALKING_GRAPH_FILE)
+    args = parser.parse_args()
+
+    inputs = args.inputs or sorted(glob.glob(os.path.join("cache", "*.json")))
+    n_nodes, n_edges = build_graph_file(inputs, args.output)
+    print(f"Wrote {n_nodes} nodes and {n_edges} edges to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import numpy as np
+
+# Reversals that shorten a tour by less than this many metres don't count
+MIN_IMPROVEMENT = 1e-6
+
+def tour_length(order, cost, closed=False):
+    """Total cost of visiting stops in order, returning to the first one when closed"""
+    stops = list(order) + [order[0]] if closed and order else list(order)
+    return float(sum(cost[a, b] for a, b in zip(stops, stops[1:])))
+
+def nearest_neighbour(cost, start=0):
+    """Greedy tour from start that always walks to the closest unvisited stop"""
+    n = len(cost)
+    order = [start]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[start] = False
+    while unvisited.any():
+        row = np.where(unvisited, cost[order[-1]], np.inf)
+        nxt = int(np.argmin(row))
+        order.append(nxt)
+        unvisited[nxt] = False
+    return order
+
+def two_opt(order, cost, closed=False):
+    """Reverse segments of the tour while that shortens it; the first stop stays first.
+
+    Lengths are recomputed in full for each candidate, so costs don't have
+    to be symmetric. That is O(n^3) per pass, fine for a campus-sized list
+    of stops.
+    """
+    order = list(order)
+    best = tour_length(order, cost, closed)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(order) - 1):
+            for j in range(i + 1, len(order)):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                length = tour_length(candidate, cost, closed)
+                if length < best - MIN_IMPROVEMENT:
+                    order, best = candidate, length
+                    improved = True
+    return order
+
+def optimise_tour(cost, start=0, closed=False):
+    """Short visiting order over a square cost matrix: nearest neighbour, then 2-opt"""
+    cost = np.asarray(cost, dtype=float)
+    if len(cost) == 0:
+        return []
+    return two_opt(nearest_neighbour(cost, start), cost, closed)